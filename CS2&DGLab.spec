@@ -26,12 +26,14 @@ a = Analysis(
         'pydantic',
         'webview',
         'aiohttp',
+        'orjson',
         'qrcode',
         'PIL',
         'PIL._tkinter_finder',
         'numpy',
         'pydglab_ws',
         'src.api.main',
+        'src.api.server',
         'src.core.dglab_controller',
         'src.core.game_listener',
         'src.config.config_manager',
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+
+from src.utils.metrics import Histogram
+
+# 每个订阅者最多积压的消息数
+SUBSCRIBER_QUEUE_SIZE = 8
+
+BROADCAST_SECONDS = Histogram("cs2dglab_broadcast_seconds", "一次状态广播（序列化并投递给全部订阅者）的耗时")
+
+
+class Subscription:
+    """单个订阅者的有界消息队列"""
+
+    __slots__ = ("queue", "resyncs")
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize)
+        self.resyncs = 0  # 因积压被重新同步的次数
+
+    def offer(self, message: str):
+        """投递消息，队列已满时丢弃积压只保留最新状态"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.resyncs += 1
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+class EventBus:
+    """状态广播总线：状态变化时才发布，每条消息只序列化一次"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._latest_data = None
+        self.latest = None  # 最近一次发布的已序列化消息
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, data: dict) -> bool:
+        """发布状态，与上次相同则忽略，返回是否实际发布"""
+        if data == self._latest_data:
+            return False
+        started = time.perf_counter()
+        self._latest_data = data
+        self.latest = json.dumps(data, ensure_ascii=False)
+        # API和OBS服务器运行在同一个事件循环中，直接投递
+        for subscription in tuple(self._subscribers):
+            subscription.offer(self.latest)
+        BROADCAST_SECONDS.observe(time.perf_counter() - started)
+        return True
+
+    def subscribe(self) -> Subscription:
+        """新建订阅，并立即放入当前状态作为初始快照"""
+        subscription = Subscription(self.queue_size)
+        if self.latest is not None:
+            subscription.offer(self.latest)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
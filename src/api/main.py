@@ -1,19 +1,26 @@
 import time
+# 模块开始导入的时间，作为启动计时的起点
+_IMPORT_STARTED = time.perf_counter()
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi import Request
+from fastapi.responses import PlainTextResponse, Response
 import asyncio
-from src.core.dglab_controller import DGLabController
+from src.core.dglab_hub import DGLabHub
 from src.core.game_listener import GameStateListener
 from src.config.config_manager import ConfigManager
+from src.api.event_bus import EventBus
+from src.utils.metrics import REGISTRY, Gauge
+from src.utils.startup import StartupTimer
+from src.utils.qrcode import QRCODE_CACHE, QRCODE_FORMATS
 from src.utils.network import get_local_ip
-from src.utils.qrcode import generate_qrcode
-from src.utils.cs2_path import find_cs2_install_path, setup_cs2_gamestate_cfg
-from src.utils.network import get_local_ip, get_network_interfaces, get_local_ip_by_interface
-import json
+from src.utils.gsi_profiles import DEFAULT_PROFILE
+from src.core.rules import required_sections
+from src.core import waveform_synth
+from src.utils.network import get_local_ip, get_network_interfaces, get_local_ip_by_interface, loopback_host
 from pydantic import BaseModel
 from typing import Any
-import webview
 import os
 import sys
 
@@ -30,6 +37,19 @@ app.add_middleware(
 
 # 配置管理
 config = ConfigManager()
+
+# 状态广播
+bus = EventBus()
+
+# 启动计时，导入阶段从模块开始导入算起
+startup = StartupTimer(_IMPORT_STARTED)
+startup.mark("import", _IMPORT_STARTED, time.perf_counter())
+
+# 等待DGLab本地终端创建的最长时间（秒）
+DGLAB_READY_TIMEOUT = 3
+
+# 单次发送的超时时间，超时的客户端视为卡死并断开
+WS_SEND_TIMEOUT = 2.0
 def get_resource_path(relative_path):
     """获取资源文件的绝对路径"""
     if hasattr(sys, '_MEIPASS'):
@@ -40,12 +60,12 @@ def get_resource_path(relative_path):
 # 全局状态
 class AppState:
     def __init__(self):
-        self.dglab = None
+        self.hub = None
+        self.dglab = None  # 第一台设备，主界面显示它的状态
         self.game_listener = None
-        self.websocket_connections = []
         self.strength_a = 0
         self.strength_b = 0
-        self.qrcode_path = ""
+        self.qrcode_urls = []  # 每台设备二维码的内容（绑定地址）
         self.max_strength_A = 0
         self.max_strength_B = 0
         self.health = 100
@@ -54,19 +74,12 @@ class AppState:
 
 state = AppState()
 
-# 窗口控制API类
-class WindowApi:
-    def minimize_window(self):
-        """最小化窗口"""
-        if webview.windows:
-            webview.windows[0].minimize()
-        return {"status": "success"}
-    
-    def close_window(self):
-        """关闭窗口"""
-        if webview.windows:
-            webview.windows[0].destroy()
-        return {"status": "success"}
+# 在/api/metrics输出时读取的瞬时指标
+Gauge("cs2dglab_command_queue_depth", "所有设备的调度器中待发送的指令数",
+      lambda: sum(device.queue.qsize() for device in state.hub.devices) if state.hub else 0)
+Gauge("cs2dglab_devices_connected", "已绑定的DGLab设备数量",
+      lambda: state.hub.connected_count if state.hub else 0)
+Gauge("cs2dglab_ws_subscribers", "状态推送WebSocket的订阅者数量", lambda: bus.subscriber_count)
 
 frontend_path = get_resource_path("src/frontend")
 if os.path.exists(frontend_path):
@@ -80,21 +93,39 @@ class ConfigUpdate(BaseModel):
     value: Any
 
 # WebSocket管理
-async def broadcast(data: dict):
-    """向所有连接的客户端广播数据"""
-    for connection in state.websocket_connections:
-        await connection.send_text(json.dumps(data))
+async def pump_subscription(websocket: WebSocket, subscription):
+    """把订阅队列中的消息发送给单个客户端，慢客户端不会阻塞其他客户端"""
+    try:
+        while True:
+            message = await subscription.get()
+            await asyncio.wait_for(websocket.send_text(message), WS_SEND_TIMEOUT)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # 发送失败或超时，关闭连接让接收循环退出
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def serve_status_stream(websocket: WebSocket):
+    """向客户端推送状态：连接时发送当前快照，之后只在状态变化时推送"""
     await websocket.accept()
-    state.websocket_connections.append(websocket)
+    subscription = bus.subscribe()
+    sender = asyncio.create_task(pump_subscription(websocket, subscription))
     try:
         while True:
             # 保持连接
             await websocket.receive_text()
-    except WebSocketDisconnect:
-        state.websocket_connections.remove(websocket)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        sender.cancel()
+        bus.unsubscribe(subscription)
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await serve_status_stream(websocket)
 
 # API端点
 @app.get("/api/status")
@@ -108,61 +139,83 @@ async def get_status():
         "health": state.health,
         "player_status": state.player_status,
         "round_status": state.round_status,
-        "qrcode_available": state.qrcode_path != "",
-        "connected": state.dglab and state.dglab.is_connected
+        "qrcode_available": bool(state.qrcode_urls),
+        "connected": state.dglab and state.dglab.is_connected,
+        "scheduler": state.dglab.queue.stats if state.dglab else None,
+        "replay": state.dglab.replay_stats if state.dglab else None
     }
 
 
+@app.get("/api/devices")
+async def get_devices():
+    """获取所有设备及其绑定玩家的状态"""
+    if not state.hub:
+        return {"devices": []}
+    # 按会话绑定的控制器找到设备对应的玩家，不依赖会话的顺序
+    sessions = state.game_listener.sessions.values() if state.game_listener else ()
+    by_device = {id(session.dglab_controller): session for session in sessions}
+    devices = []
+    for index, device in enumerate(state.hub.devices):
+        session = by_device.get(id(device))
+        devices.append({
+            "index": index,
+            "name": session.name if session else "",
+            "steamid": session.steamid if session else "",
+            "connected": device.is_connected,
+            "strength": {"a": device.current_strength_A, "b": device.current_strength_B},
+            "max_strength": {"a": device.max_strength_A, "b": device.max_strength_B},
+            "health": session.snapshot.health if session else 0,
+            "player_status": session.player_status if session else "",
+            "qrcode_path": qrcode_path(index) if index < len(state.qrcode_urls) else "",
+            "scheduler": device.queue.stats,
+            "replay": device.replay_stats,
+        })
+    return {"devices": devices}
+
+@app.get("/api/startup")
+async def get_startup():
+    """启动各阶段的开始时间和耗时（毫秒，从模块导入开始计）"""
+    return startup.report()
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus文本格式的运行指标"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/qrcode")
 async def get_qrcode():
-    """获取二维码图片"""
-    return {"qrcode_path": "/static/temp_qrcode.png"}
+    """获取第一台设备的二维码地址"""
+    return {"qrcode_path": qrcode_path(0) if state.qrcode_urls else ""}
+
+@app.get("/api/qrcode/{device}.{fmt}")
+async def get_qrcode_image(device: int, fmt: str, request: Request):
+    """设备绑定二维码图片，按内容缓存，内容不变时返回304"""
+    if fmt not in QRCODE_FORMATS or not 0 <= device < len(state.qrcode_urls):
+        return Response(status_code=404)
+    url = state.qrcode_urls[device]
+    image = QRCODE_CACHE.peek(url, fmt) or await asyncio.to_thread(QRCODE_CACHE.get, url, fmt)
+    # 切换网络接口后内容会变化，浏览器每次都要用ETag验证
+    headers = {"ETag": image.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == image.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(image.body, media_type=image.media_type, headers=headers)
 
 @app.get("/api/config")
 async def get_config():
     """获取配置"""
-    # 确保返回的配置值是正确的类型
-    config_data = config.config.copy()
-    
-    # 确保数值类型的配置项是正确的类型
-    numeric_fields = ["hit", "voice_A", "voice_B", "is_voice", "enable_hit", 
-                      "enable_flash", "enable_burn", "enable_smoke", "enable_death",
-                      "fixed_mode_strength", "challenge_mode_initial_strength",
-                      "challenge_mode_kill_reduction", "challenge_mode_death_boost"]
-    
-    for field in numeric_fields:
-        if field in config_data:
-            # 尝试转换为整数，如果失败则保持原值
-            try:
-                config_data[field] = int(config_data[field])
-            except (ValueError, TypeError):
-                pass
-    
-    return config_data
+    # 数值项在配置变化时统一转换，这里直接复用
+    return config.public_config()
 
 @app.post("/api/config")
 async def update_config(update: ConfigUpdate):
     """更新配置"""
-    config.update(update.key, update.value)
+    try:
+        config.update(update.key, update.value)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     print(f"更新配置: {update.key} = {update.value}")
-    return {"status": "success", "config": config.config}
-
-# 新增窗口控制API端点
-@app.post("/api/window/minimize")
-async def minimize_window():
-    """最小化窗口API"""
-    if webview.windows:
-        webview.windows[0].minimize()
-        return {"status": "success"}
-    return {"status": "error", "message": "No window found"}
-
-@app.post("/api/window/close")
-async def close_window():
-    """关闭窗口API"""
-    if webview.windows:
-        webview.windows[0].destroy()
-        return {"status": "success"}
-    return {"status": "error", "message": "No window found"}
+    return {"status": "success", "config": config.config, "version": config.version}
+
 @app.get("/api/network/interfaces")
 async def get_network_interfaces_list():
     """获取网络接口列表"""
@@ -185,25 +238,18 @@ async def set_network_interface(data: dict):
         config.update("network_interface", interface)
         
         # 获取新IP地址并更新二维码
+        dglab_port = config.server["dglab_port"]
         if interface:
-            ip_address = get_local_ip_by_interface(interface)
+            ip_address = get_local_ip_by_interface(interface, dglab_port)
         else:
-            ip_address = get_local_ip()
+            ip_address = get_local_ip(dglab_port)
             
         # 更新DGLab控制器中的IP地址
-        if state.dglab:
-            state.dglab.ip = ip_address.replace("ws://", "").replace(":5678", "")
-            
-        # 生成新的二维码
-        qrcode_url = state.dglab.client.get_qrcode(ip_address) if state.dglab and state.dglab.client else ip_address
-        print(qrcode_url)
-        # 确保前端目录存在
-        frontend_dir = get_resource_path("src/frontend")
-        if not os.path.exists(frontend_dir):
-            os.makedirs(frontend_dir)
+        if state.hub:
+            state.hub.ip_address = ip_address
             
-        qrcode_path = os.path.join(frontend_dir, "temp_qrcode.png")
-        state.qrcode_path = generate_qrcode(qrcode_url, qrcode_path)
+        # 绑定地址变化时重新渲染二维码
+        await asyncio.to_thread(update_device_qrcodes, ip_address)
         return {"status": "success", "message": "网络接口设置成功"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -214,94 +260,132 @@ async def get_current_network():
     try:
         # 从配置中获取网络接口设置
         interface = config.get("network_interface")
+        dglab_port = config.server["dglab_port"]
         if interface:
-            ip = get_local_ip_by_interface(interface)
+            ip = get_local_ip_by_interface(interface, dglab_port)
         else:
-            ip = get_local_ip()
+            ip = get_local_ip(dglab_port)
         return {"status": "success", "ip": ip, "interface": interface}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+def qrcode_path(index: int, fmt: str = "png") -> str:
+    """设备二维码的地址，内容变化时版本号随之变化"""
+    image = QRCODE_CACHE.peek(state.qrcode_urls[index], fmt)
+    version = "?v=" + image.etag.strip('"') if image else ""
+    return f"/api/qrcode/{index}.{fmt}{version}"
+
+def update_device_qrcodes(ip_address):
+    """更新每台设备的二维码内容，只有内容变化时才重新渲染"""
+    urls = [device.client.get_qrcode(ip_address) if device.client else ip_address
+            for device in state.hub.devices]
+    for url in urls:
+        QRCODE_CACHE.get(url, "png")
+    state.qrcode_urls = urls
+
+def setup_cs2_config(server_config):
+    """查找CS2路径并写入GSI配置，在线程中执行"""
+    from src.utils.cs2_path import find_cs2_install_path, setup_cs2_gamestate_cfg
+
+    cs2_path = find_cs2_install_path()
+    print(f"找到CS2安装路径: {cs2_path}")
+    # 监听所有地址时，游戏仍通过本机回环地址上报
+    gsi_uri = f"http://{loopback_host(server_config['gsi_host'])}:{server_config['gsi_port']}"
+    cfg = config.snapshot
+    if setup_cs2_gamestate_cfg(cs2_path, gsi_uri, cfg.observer_mode,
+                               config.get("gsi_profile", DEFAULT_PROFILE), required_sections(), cfg.gsi_token):
+        print("CS2游戏状态配置成功")
+    else:
+        print("CS2游戏状态配置失败")
+
+def publish_status():
+    """汇总主设备的强度和主玩家的游戏状态并广播，与上次相同时不会推送"""
+    if not state.dglab:
+        return
+    state.strength_a = state.dglab.current_strength_A
+    state.strength_b = state.dglab.current_strength_B
+    state.max_strength_A = state.dglab.max_strength_A
+    state.max_strength_B = state.dglab.max_strength_B
+    session = state.game_listener.primary if state.game_listener else None
+    if session:
+        state.health = session.snapshot.health
+        state.player_status = session.player_status
+        state.round_status = session.round_status
+
+    bus.publish({
+        "type": "status_update",
+        "strength": {
+            "a": state.strength_a,
+            "b": state.strength_b
+        },
+        "max_strength": {
+            "a": state.max_strength_A,
+            "b": state.max_strength_B
+        },
+        "game": {
+            "health": state.health,
+            "player_status": state.player_status,
+            "round_status": state.round_status
+        },
+        "connected": state.dglab.is_connected
+    })
+
 # 启动后台任务
 async def start_background_tasks():
-    """启动所有后台任务"""
-    # 初始化DGLab控制器
-    ip_address = get_local_ip()
-    state.dglab = DGLabController(ip_address)
-    
-    # 启动DGLab服务
-    asyncio.create_task(state.dglab.start())
-    # 等待客户端连接建立
-    retry_count = 0
-    while retry_count < 30 and not state.dglab.client:  # 等待最多3秒
-        await asyncio.sleep(0.1)
-        retry_count += 1
-    
-    if state.dglab.client:
-        qrcode_url = state.dglab.client.get_qrcode(ip_address)
-    else:
-        qrcode_url = ip_address
-    
-    # 确保前端目录存在
-    frontend_dir = get_resource_path("src/frontend")
-    if not os.path.exists(frontend_dir):
-        os.makedirs(frontend_dir)
-    
-    qrcode_path = os.path.join(frontend_dir, "temp_qrcode.png")
-    state.qrcode_path = generate_qrcode(qrcode_url, qrcode_path)
-    
-    # 查找CS2路径并配置
-    try:
-        cs2_path = find_cs2_install_path()
-        print(f"找到CS2安装路径: {cs2_path}")
-        if setup_cs2_gamestate_cfg(cs2_path):
-            print("CS2游戏状态配置成功")
-        else:
-            print("CS2游戏状态配置失败")
-    except Exception as e:
-        print(f"CS2路径处理警告: {e}")
-    
-    # 启动游戏状态监听器
-    state.game_listener = GameStateListener(config, state.dglab.queue,state.dglab)
-    await state.game_listener.start()
-    # 启动强度监控任务
-    async def monitor_strength():
-        while True:
-            if state.dglab:
-                # 更新强度数据
-                state.strength_a = state.dglab.current_strength_A
-                state.strength_b = state.dglab.current_strength_B
-                state.max_strength_A = state.dglab.max_strength_A
-                state.max_strength_B = state.dglab.max_strength_B
-                # 更新游戏状态
-                if state.game_listener:
-                    state.health = state.game_listener.health
-                    state.player_status = state.game_listener.player_status
-                    state.round_status = state.game_listener.round_status
-
-                await broadcast({
-                    "type": "status_update",
-                    "strength": {
-                        "a": state.strength_a,
-                        "b": state.strength_b
-                    },
-                    "max_strength": {
-                        "a": state.max_strength_A,
-                        "b": state.max_strength_B
-                    },
-                    "game": {
-                        "health": state.health,
-                        "player_status": state.player_status,
-                        "round_status": state.round_status
-                    },
-                    "connected": state.dglab.is_connected
-                })
-            await asyncio.sleep(0.1)
-    
-    # 启动监控任务
-    asyncio.create_task(monitor_strength())
-    
+    """启动所有后台任务
+
+    DGLab服务、CS2配置和GSI监听互不依赖，并发启动；二维码在设备终端创建后生成
+    """
+    server_config = config.server
+    players = config.players
+
+    # 初始化DGLab设备，每个绑定的玩家对应一台设备
+    ip_address = get_local_ip(server_config["dglab_port"])
+    state.hub = DGLabHub(ip_address, server_config["dglab_host"], server_config["dglab_port"], len(players))
+    state.dglab = state.hub.devices[0]
+    state.dglab.on_status_change = publish_status
+
+    async def start_dglab():
+        asyncio.create_task(state.hub.start())
+        await asyncio.wait_for(state.hub.wait_ready(), DGLAB_READY_TIMEOUT)
+
+    async def start_dglab_and_qrcodes():
+        await startup.run("dglab", start_dglab())
+        # 终端未能创建时二维码退化为服务地址
+        await startup.run("qrcode", asyncio.to_thread(update_device_qrcodes, ip_address))
+
+    async def start_game_listener():
+        # 开启波形合成时预先生成全部波形
+        if config.snapshot.synth_pulses:
+            waveform_synth.prewarm()
+        # 启动游戏状态监听器，按steamid把数据路由给绑定的设备
+        state.game_listener = GameStateListener(config)
+        state.game_listener.on_status_change = publish_status
+        for player, device in zip(players, state.hub.devices):
+            state.game_listener.add_player(player["steamid"], device.queue, device, player["name"])
+        await state.game_listener.start(server_config["gsi_host"], server_config["gsi_port"])
+
+    await asyncio.gather(
+        start_dglab_and_qrcodes(),
+        startup.run("cs2_config", asyncio.to_thread(setup_cs2_config, server_config)),
+        startup.run("gsi_listener", start_game_listener()),
+    )
+
+    # 监视配置文件的外部修改
+    asyncio.create_task(config.watch())
+
+    # 之后的状态变化由设备和监听器触发广播
+    publish_status()
+    startup.finish()
+
 
 # 启动事件
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(start_background_tasks())
\ No newline at end of file
+    asyncio.create_task(start_background_tasks())
+
+# 关闭事件：写入尚未保存的配置
+@app.on_event("shutdown")
+async def shutdown_event():
+    if state.game_listener:
+        await state.game_listener.stop()
+    await config.flush()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import HTMLResponse
+from fastapi.staticfiles import StaticFiles
+
+from src.api.main import app, config, get_resource_path, serve_status_stream, startup
+
+# 停止时等待服务结束的最长时间（秒）
+SHUTDOWN_TIMEOUT = 5
+
+def create_obs_app():
+    """创建OBS页面应用"""
+    obs_app = FastAPI(title="CS2&DGLab OBS Server")
+    frontend_dir = get_resource_path(os.path.join('src', 'frontend'))
+
+    # 只提供obs.html页面
+    @obs_app.get("/", response_class=HTMLResponse)
+    async def get_obs_page():
+        obs_html_path = os.path.join(frontend_dir, "obs.html")
+        if os.path.exists(obs_html_path):
+            with open(obs_html_path, "r", encoding="utf-8") as f:
+                return f.read()
+        return "<h1>OBS Page Not Found</h1>"
+
+    # 状态推送，与主界面共用同一个状态广播
+    @obs_app.websocket("/ws")
+    async def obs_status_stream(websocket: WebSocket):
+        await serve_status_stream(websocket)
+
+    # 挂载静态文件目录，以便CSS和JS等资源可以被访问
+    if os.path.exists(frontend_dir):
+        obs_app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+    return obs_app
+
+class ServerRunner:
+    """在同一个事件循环中运行主服务与OBS服务
+
+    主服务启动时会在同一循环中启动游戏状态监听和DGLab服务器，
+    所有组件共享一个事件循环，启动和关闭耗时在此统一统计。
+    桌面版在后台线程中运行，无界面模式直接在主线程中运行
+    """
+
+    def __init__(self):
+        server_config = config.server
+        frontend_dir = get_resource_path(os.path.join('src', 'frontend'))
+        if not os.path.exists(frontend_dir):
+            os.makedirs(frontend_dir)
+        self.servers = [
+            uvicorn.Server(uvicorn.Config(
+                app,
+                host=server_config["api_host"],
+                port=server_config["api_port"],
+                log_level="warning",
+            )),
+            uvicorn.Server(uvicorn.Config(
+                create_obs_app(),
+                host=server_config["obs_host"],
+                port=server_config["obs_port"],
+                log_level="warning",
+            )),
+        ]
+        self.thread = None
+
+    async def serve(self):
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(server.serve()) for server in self.servers]
+        while not all(server.started for server in self.servers):
+            if any(task.done() for task in tasks):
+                break
+            await asyncio.sleep(0.05)
+        print(f"服务已启动，耗时 {time.perf_counter() - start:.3f}s")
+        startup.mark("servers", start, time.perf_counter())
+        await asyncio.gather(*tasks)
+
+    def start(self):
+        """在后台线程中启动事件循环"""
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """通知所有服务退出并等待结束"""
+        start = time.perf_counter()
+        for server in self.servers:
+            server.should_exit = True
+        if self.thread:
+            self.thread.join(SHUTDOWN_TIMEOUT)
+        print(f"服务已停止，耗时 {time.perf_counter() - start:.3f}s")
@@ -1,30 +1,364 @@
+import asyncio
 import json
+import os
+import stat
+import tempfile
+import threading
+from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+# 进程的umask，只能通过设置再恢复读取，在导入时读取一次避免与其他线程竞争
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# DGLab波形参数范围（见pydglab_ws.typing）
+PULSE_FREQUENCY_RANGE = (10, 240)
+PULSE_STRENGTH_RANGE = (0, 100)
+PULSE_MAX_LENGTH = 86  # pydglab_ws.utils.PULSE_DATA_MAX_LENGTH
+PULSE_FRAME_DURATION = 0.1  # DGLab每帧波形的时长（秒）
+
+# 配置写盘的合并窗口（秒），窗口内的多次更新只写一次
+SAVE_DELAY = 0.5
+# 检查配置文件外部修改的间隔（秒）
+WATCH_INTERVAL = 1.0
+
+# 各服务默认的监听地址和端口
+DEFAULT_SERVER_CONFIG = {
+    "api_host": "127.0.0.1",
+    "api_port": 8000,
+    "obs_host": "127.0.0.1",
+    "obs_port": 8001,
+    "gsi_host": "127.0.0.1",
+    "gsi_port": 3000,
+    "dglab_host": "0.0.0.0",
+    "dglab_port": 5678,
+}
+
+# 写入GSI配置文件的默认令牌，监听器只接受带有配置令牌的数据；设为空字符串关闭校验
+DEFAULT_GSI_TOKEN = "MYTOKENHERE"
+# GSI请求体的默认大小上限（KB）
+DEFAULT_GSI_MAX_BODY_KB = 256
+
+# 玩家与设备的绑定，第i个玩家对应第i台设备；steamid为空时跟随本机玩家
+DEFAULT_PLAYERS = [{"name": "本机玩家", "steamid": ""}]
+
+# 需要以整数形式提供给前端的配置项
+NUMERIC_FIELDS = ("hit", "voice_A", "voice_B", "is_voice", "enable_hit",
+                  "enable_flash", "enable_burn", "enable_smoke", "enable_death",
+                  "fixed_mode_strength", "challenge_mode_initial_strength",
+                  "challenge_mode_kill_reduction", "challenge_mode_death_boost",
+                  "effect_tick_frames", "effect_horizon_frames", "observer_mode",
+                  "synth_pulses", "strength_tick_ms", "strength_decay", "gsi_max_body_kb")
+
+
+class Mode(str, Enum):
+    """强度模式"""
+    NORMAL = "normal"
+    FIXED = "fixed"
+    CHALLENGE = "challenge"
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """已校验的只读配置快照，配置变化时整体替换"""
+    version: int
+    mode: Mode
+    enable_hit: bool
+    enable_flash: bool
+    enable_smoke: bool
+    enable_burn: bool
+    enable_death: bool
+    hit_strength: float
+    fixed_mode_strength: int
+    challenge_mode_initial_strength: int
+    challenge_mode_kill_reduction: int
+    challenge_mode_death_boost: int
+    effect_tick_frames: int
+    effect_horizon_frames: int
+    observer_mode: bool
+    synth_pulses: bool
+    strength_tick: float
+    strength_decay: int
+    gsi_token: str
+    gsi_max_body: int
+    pulse_data: Mapping[str, tuple]
+
+    @classmethod
+    def build(cls, config: dict, version: int, pulse_data: Mapping[str, tuple]) -> "ConfigSnapshot":
+        try:
+            mode = Mode(config.get("mode", "normal"))
+        except ValueError:
+            print(f"未知的模式 {config.get('mode')}，使用普通模式")
+            mode = Mode.NORMAL
+        return cls(
+            version=version,
+            mode=mode,
+            enable_hit=_as_int(config, "enable_hit", 1) == 1,
+            enable_flash=_as_int(config, "enable_flash", 1) == 1,
+            enable_smoke=_as_int(config, "enable_smoke", 1) == 1,
+            enable_burn=_as_int(config, "enable_burn", 1) == 1,
+            enable_death=_as_int(config, "enable_death", 1) == 1,
+            hit_strength=_as_int(config, "hit", 100) / 100,
+            fixed_mode_strength=_as_int(config, "fixed_mode_strength", 50),
+            challenge_mode_initial_strength=_as_int(config, "challenge_mode_initial_strength", 30),
+            challenge_mode_kill_reduction=_as_int(config, "challenge_mode_kill_reduction", 10),
+            challenge_mode_death_boost=_as_int(config, "challenge_mode_death_boost", 20),
+            effect_tick_frames=max(1, _as_int(config, "effect_tick_frames", 2)),
+            effect_horizon_frames=max(1, _as_int(config, "effect_horizon_frames", 5)),
+            observer_mode=_as_int(config, "observer_mode", 0) == 1,
+            synth_pulses=_as_int(config, "synth_pulses", 0) == 1,
+            strength_tick=max(50, _as_int(config, "strength_tick_ms", 200)) / 1000,
+            strength_decay=max(0, _as_int(config, "strength_decay", 0)),
+            gsi_token=str(config.get("gsi_token", DEFAULT_GSI_TOKEN) or ""),
+            gsi_max_body=max(16, _as_int(config, "gsi_max_body_kb", DEFAULT_GSI_MAX_BODY_KB)) * 1024,
+            pulse_data=pulse_data,
+        )
+
+
+def _as_int(config: dict, key: str, default: int) -> int:
+    """读取整数配置项，无法转换时使用默认值"""
+    try:
+        return int(config.get(key, default))
+    except (ValueError, TypeError):
+        print(f"配置项 {key} 的值无效，使用默认值 {default}")
+        return default
+
+
+def compile_pulse(name: str, raw) -> tuple:
+    """将JSON中的波形列表校验并转换为不可变的元组"""
+    if not isinstance(raw, (list, tuple)) or not raw or len(raw) > PULSE_MAX_LENGTH:
+        raise ValueError(f"波形 {name} 长度必须在 1~{PULSE_MAX_LENGTH} 之间")
+    operations = []
+    for index, operation in enumerate(raw):
+        try:
+            frequency, strength = operation
+            frequency = tuple(int(value) for value in frequency)
+            strength = tuple(int(value) for value in strength)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"波形 {name} 第{index + 1}帧格式错误: {e}")
+        if len(frequency) != 4 or len(strength) != 4:
+            raise ValueError(f"波形 {name} 第{index + 1}帧必须包含4个频率值和4个强度值")
+        if not all(PULSE_FREQUENCY_RANGE[0] <= value <= PULSE_FREQUENCY_RANGE[1] for value in frequency):
+            raise ValueError(f"波形 {name} 第{index + 1}帧频率超出范围 {PULSE_FREQUENCY_RANGE}")
+        if not all(PULSE_STRENGTH_RANGE[0] <= value <= PULSE_STRENGTH_RANGE[1] for value in strength):
+            raise ValueError(f"波形 {name} 第{index + 1}帧强度超出范围 {PULSE_STRENGTH_RANGE}")
+        operations.append((frequency, strength))
+    return tuple(operations)
+
 
 class ConfigManager:
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", save_delay: float = SAVE_DELAY, persist: bool = True):
         self.config_path = Path(config_path)
+        self.save_delay = save_delay
+        # persist为False时更新只在内存中生效（用于回放等工具）
+        self.persist = persist
+        self._pulse_cache = None
+        # 配置版本号，每次更新单调递增
+        self.version = 0
+        self._saved_version = 0
+        self._save_handle = None
+        self._write_lock = threading.Lock()
+        self._file_mtime = None
         self._load_config()
 
     def _load_config(self):
         """加载配置文件"""
         with open(self.config_path, "r", encoding="utf-8") as f:
             self.config = json.load(f)
+        self._file_mtime = os.stat(self.config_path).st_mtime_ns
+        self._on_changed(pulse_changed=True)
+
+    def _on_changed(self, pulse_changed: bool = False):
+        """配置变化后重建快照和缓存"""
+        if pulse_changed:
+            self._pulse_cache = None
+        self._public_config = None
+        self.snapshot = ConfigSnapshot.build(self.config, self.version, self.pulse_data)
 
     def get(self, key: str, default=None):
         """获取配置项"""
         return self.config.get(key, default)
 
     def update(self, key: str, value):
-        """更新配置项并保存"""
+        """更新配置项，立即在内存中生效，延迟合并写盘"""
+        if key == "pulse_data":
+            # 先校验再写入，避免无效波形覆盖配置
+            if not isinstance(value, dict):
+                raise ValueError("pulse_data必须是波形名称到波形列表的映射")
+            for name, raw in value.items():
+                compile_pulse(name, raw)
         self.config[key] = value
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
+        self.version += 1
+        self._on_changed(pulse_changed=key == "pulse_data")
+        self._schedule_save()
+
+    def public_config(self) -> dict:
+        """返回提供给前端的配置，数值项已转换为整数，配置变化前复用同一结果"""
+        if self._public_config is None:
+            config_data = self.config.copy()
+            for field in NUMERIC_FIELDS:
+                if field in config_data:
+                    # 尝试转换为整数，如果失败则保持原值
+                    try:
+                        config_data[field] = int(config_data[field])
+                    except (ValueError, TypeError):
+                        pass
+            self._public_config = config_data
+        return self._public_config
+
+    async def watch(self, interval: float = WATCH_INTERVAL):
+        """监视配置文件的外部修改并热加载"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.config_path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._file_mtime:
+                continue
+            if self.dirty:
+                # 本地还有未写盘的修改，以本地为准
+                continue
+            version = self.version
+            try:
+                config = await loop.run_in_executor(None, self._read_file)
+                pulse_data = MappingProxyType({
+                    name: compile_pulse(name, raw)
+                    for name, raw in config["pulse_data"].items()
+                })
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                print(f"配置文件外部修改无效，已忽略: {e}")
+                self._file_mtime = mtime
+                continue
+            if self.version != version or self.dirty:
+                # 读取期间有本地修改，以本地为准，不能覆盖
+                continue
+            self._file_mtime = mtime
+            self.config = config
+            self.version += 1
+            self._saved_version = self.version
+            self._pulse_cache = pulse_data
+            self._on_changed()
+            print(f"已重新加载配置文件 (版本 {self.version})")
+
+    def _read_file(self) -> dict:
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未写盘的更新"""
+        return self._saved_version != self.version
+
+    def save(self):
+        """立即同步写盘（用于没有事件循环或退出前）"""
+        self._cancel_pending_save()
+        if self.persist and self.dirty:
+            self._write_atomic(self._dump(), self.version)
+
+    async def flush(self):
+        """在线程池中立即写盘，等待写入完成"""
+        self._cancel_pending_save()
+        if self.persist and self.dirty:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_atomic, self._dump(), self.version)
+
+    def _schedule_save(self):
+        if not self.persist:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(self.save_delay, self._start_save, loop)
+
+    def _cancel_pending_save(self):
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+    def _start_save(self, loop):
+        """合并窗口结束：在事件循环中序列化快照，在线程池中写盘"""
+        self._save_handle = None
+        future = loop.run_in_executor(None, self._write_atomic, self._dump(), self.version)
+        future.add_done_callback(self._on_save_done)
+
+    @staticmethod
+    def _on_save_done(future):
+        if not future.cancelled() and future.exception():
+            print(f"保存配置文件失败: {future.exception()}")
+
+    def _dump(self) -> str:
+        return json.dumps(self.config, indent=4, ensure_ascii=False)
+
+    def _file_mode(self) -> int:
+        """原配置文件的权限，文件不存在时按umask计算新文件的默认权限"""
+        try:
+            return stat.S_IMODE(os.stat(self.config_path).st_mode)
+        except OSError:
+            return 0o666 & ~_UMASK
+
+    def _write_atomic(self, content: str, version: int):
+        """写入临时文件后原子替换，写入中途崩溃不会截断原配置"""
+        with self._write_lock:
+            if version <= self._saved_version:
+                return
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.config_path.parent, prefix=self.config_path.name + ".", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp创建的文件权限为0600，替换前恢复原文件的权限
+                os.chmod(tmp_path, self._file_mode())
+                os.replace(tmp_path, self.config_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._saved_version = version
+            self._file_mtime = os.stat(self.config_path).st_mtime_ns
 
     @property
     def pulse_data(self):
-        return self.config["pulse_data"]
+        """预编译的波形库，只在pulse_data更新后重新编译"""
+        if self._pulse_cache is None:
+            self._pulse_cache = MappingProxyType({
+                name: compile_pulse(name, raw)
+                for name, raw in self.config["pulse_data"].items()
+            })
+        return self._pulse_cache
+
+    @property
+    def server(self) -> dict:
+        """服务监听配置，未配置的项使用默认值"""
+        return {**DEFAULT_SERVER_CONFIG, **self.config.get("server", {})}
+
+    @property
+    def players(self) -> list:
+        """玩家与设备的绑定列表，未配置时只绑定本机玩家
+
+        steamid重复的条目只保留第一个，否则后面的会话会覆盖前面的，设备收不到数据
+        """
+        players = []
+        seen = set()
+        for player in self.config.get("players") or DEFAULT_PLAYERS:
+            steamid = str(player.get("steamid", ""))
+            if steamid in seen:
+                print(f"玩家 {player.get('name', '')} 的steamid {steamid or '(本机玩家)'} 重复，已忽略")
+                continue
+            seen.add(steamid)
+            players.append({"name": player.get("name", ""), "steamid": steamid})
+        return players
 
     @property
     def hit_strength(self):
-        return int(self.config["hit"]) / 100
\ No newline at end of file
+        return self.snapshot.hit_strength
@@ -0,0 +1,15 @@
+import asyncio
+import time
+
+
+class SystemClock:
+    """系统时钟，回放工具可替换为虚拟时钟以快进延时效果"""
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+
+from src.core.clock import SYSTEM_CLOCK
+from src.utils.metrics import Histogram
+
+# 指令优先级，数值越小越优先
+PRIORITY_DEATH = 0
+PRIORITY_HIT = 1
+PRIORITY_STATUS = 2  # 闪光/烧伤/烟雾
+PRIORITY_DEFAULT = 3
+
+# 各优先级指令的默认有效期（秒），超时未发送则丢弃
+DEFAULT_DEADLINES = {
+    PRIORITY_DEATH: 3.0,
+    PRIORITY_HIT: 1.0,
+    PRIORITY_STATUS: 0.5,
+    PRIORITY_DEFAULT: 2.0,
+}
+
+CHANNELS = ("a", "b")
+MAX_STRENGTH_VALUE = 200
+
+COMMAND_WAIT_SECONDS = Histogram("cs2dglab_command_wait_seconds", "指令从入队到被取出发送的等待时间")
+
+
+class CommandScheduler:
+    """指令调度器：合并强度操作、按优先级发送波形、丢弃过期指令
+
+    与asyncio.Queue保持相同的put/get/task_done接口，可直接替换DGLabController.queue
+    """
+
+    def __init__(self, deadlines: dict = None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        if deadlines:
+            self.deadlines.update(deadlines)
+        # 每个通道待发送的净强度操作: (操作, 数值)，操作为 up/set/clear
+        self._strength = {channel: None for channel in CHANNELS}
+        self._strength_since = {channel: 0.0 for channel in CHANNELS}  # 通道待发送操作的最早入队时间
+        # 待发送波形: [优先级, 序号, 截止时间, 指令, 入队时间]
+        self._pulses = []
+        self._pending_pulses = {}
+        self._seq = itertools.count()
+        self._event = asyncio.Event()
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "merged": 0,
+            "dropped_stale": 0,
+            "expired": 0,
+        }
+
+    async def put(self, cmd: dict):
+        """加入一条指令"""
+        self.put_nowait(cmd)
+
+    def put_nowait(self, cmd: dict):
+        self.stats["enqueued"] += 1
+        cmd_type = cmd["type"]
+        if cmd_type == "strlup":
+            self._merge_strength(cmd["chose"], "up", cmd["data"])
+        elif cmd_type == "strlst":
+            self._merge_strength(cmd["chose"], "set", cmd["data"])
+        elif cmd_type == "strlse":
+            for channel in (cmd["chose"],) if "chose" in cmd else CHANNELS:
+                self._merge_strength(channel, "clear", 0)
+        else:
+            self._push_pulse(cmd)
+        self._event.set()
+
+    def put_back(self, cmd: dict):
+        """放回取出后未能发送的指令，强度操作合并在尚未发送的新操作之前"""
+        if cmd["type"] not in ("strlup", "strlst", "strlse"):
+            self.put_nowait(cmd)
+            return
+        channels = (cmd["chose"],) if "chose" in cmd else CHANNELS
+        pending = {channel: self._strength[channel] for channel in channels}
+        for channel in channels:
+            self._strength[channel] = None
+        self.put_nowait(cmd)
+        for channel, op in pending.items():
+            if op is not None:
+                self._merge_strength(channel, *op)
+
+    async def get(self) -> dict:
+        """取出下一条需要发送的指令"""
+        while True:
+            cmd = self._pop()
+            if cmd is not None:
+                self.stats["sent"] += 1
+                return cmd
+            self._event.clear()
+            await self._event.wait()
+
+    def get_nowait(self) -> dict:
+        """取出下一条需要发送的指令，没有时抛出asyncio.QueueEmpty"""
+        cmd = self._pop()
+        if cmd is None:
+            raise asyncio.QueueEmpty
+        self.stats["sent"] += 1
+        return cmd
+
+    def task_done(self):
+        """兼容asyncio.Queue接口"""
+
+    def qsize(self) -> int:
+        strength = sum(1 for op in self._strength.values() if op is not None)
+        return strength + len(self._pulses)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _merge_strength(self, channel: str, op: str, value: int):
+        """将新的强度操作合并进通道的待发送操作"""
+        pending = self._strength[channel]
+        if pending is None:
+            self._strength[channel] = (op, value)
+            self._strength_since[channel] = self.clock.time()
+            return
+
+        pending_op, pending_value = pending
+        if op in ("set", "clear"):
+            # 新的绝对设置覆盖之前尚未发送的操作
+            self._strength[channel] = (op, value)
+            self.stats["dropped_stale"] += 1
+        elif pending_op == "up":
+            self._strength[channel] = ("up", pending_value + value)
+            self.stats["merged"] += 1
+        else:
+            # set/clear 之后的增加可以折算成一次新的设置
+            self._strength[channel] = ("set", min(pending_value + value, MAX_STRENGTH_VALUE))
+            self.stats["merged"] += 1
+
+    def _push_pulse(self, cmd: dict):
+        priority = cmd.get("priority", PRIORITY_DEFAULT)
+        now = self.clock.time()
+        deadline = now + cmd.get("ttl", self.deadlines.get(priority, DEFAULT_DEADLINES[PRIORITY_DEFAULT]))
+        key = (priority, id(cmd["data"]))
+        entry = self._pending_pulses.get(key)
+        if entry is not None:
+            # 同一波形尚未发送时只延长有效期，不重复排队
+            entry[2] = deadline
+            self.stats["merged"] += 1
+            return
+        entry = [priority, next(self._seq), deadline, cmd, now]
+        self._pending_pulses[key] = entry
+        heapq.heappush(self._pulses, entry)
+
+    def _pop(self):
+        """先发送合并后的强度操作，再按优先级发送未过期的波形"""
+        strength = self._strength
+        now = self.clock.time()
+        if strength["a"] is not None or strength["b"] is not None:
+            if strength["a"] == ("clear", 0) and strength["b"] == ("clear", 0):
+                strength["a"] = strength["b"] = None
+                COMMAND_WAIT_SECONDS.observe(now - min(self._strength_since.values()))
+                return {"type": "strlse", "data": 100}
+            channel = "a" if strength["a"] is not None else "b"
+            op, value = strength[channel]
+            strength[channel] = None
+            COMMAND_WAIT_SECONDS.observe(now - self._strength_since[channel])
+            if op == "up":
+                return {"type": "strlup", "data": value, "chose": channel}
+            if op == "set":
+                return {"type": "strlst", "data": value, "chose": channel}
+            return {"type": "strlse", "data": 100, "chose": channel}
+
+        while self._pulses:
+            entry = heapq.heappop(self._pulses)
+            cmd = entry[3]
+            del self._pending_pulses[(entry[0], id(cmd["data"]))]
+            if entry[2] < now:
+                self.stats["expired"] += 1
+                continue
+            COMMAND_WAIT_SECONDS.observe(now - entry[4])
+            return cmd
+        return None
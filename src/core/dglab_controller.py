@@ -1,6 +1,7 @@
 import asyncio
 import os
 import sys
+import time
 from pydglab_ws import (
     Channel,
     RetCode,
@@ -9,6 +10,34 @@ from pydglab_ws import (
     StrengthData,
     FeedbackButton
 )
+from src.core.command_scheduler import (
+    CommandScheduler,
+    PRIORITY_DEATH,
+    PRIORITY_DEFAULT,
+    PRIORITY_HIT,
+    PRIORITY_STATUS,
+)
+from src.config.config_manager import PULSE_FRAME_DURATION
+from src.utils.metrics import Counter
+
+COMMANDS_SENT = Counter("cs2dglab_commands_sent_total", "发送到设备的指令数", ("type",))
+COMMANDS_SENT_BY_TYPE = {cmd_type: COMMANDS_SENT.labels(cmd_type) for cmd_type in ("pluse", "strlup", "strlse", "strlst")}
+DEVICE_RECONNECTS = Counter("cs2dglab_device_reconnects_total", "设备断开后重新绑定的次数")
+HELD_COMMANDS = Counter("cs2dglab_held_commands_total", "断线期间缓存的指令数", ("result",))
+HELD_REPLAYED = HELD_COMMANDS.labels("replayed")
+HELD_EXPIRED = HELD_COMMANDS.labels("expired")
+HELD_DROPPED = HELD_COMMANDS.labels("dropped")
+
+# 断线期间最多缓存的指令数
+REPLAY_BUFFER_SIZE = 64
+# 断线期间缓存的波形有效期（秒），受伤等即时反馈过期即丢弃；
+# 强度指令在缓存中按通道合并为最终状态，重连后重新应用
+REPLAY_PULSE_TTL = {
+    PRIORITY_DEATH: 3.0,
+    PRIORITY_HIT: 0.5,
+    PRIORITY_STATUS: 0.0,
+    PRIORITY_DEFAULT: 1.0,
+}
 
 def get_resource_path(relative_path):
     """获取资源文件的绝对路径"""
@@ -19,31 +48,46 @@ def get_resource_path(relative_path):
     return os.path.join(os.path.abspath("."), relative_path)
 
 class DGLabController:
-    def __init__(self, ip_address: str):
+    def __init__(self, ip_address: str, host: str = "0.0.0.0", port: int = 5678):
         self.ip_address = ip_address
+        self.host = host
+        self.port = port
         self.server = None
         self.client = None
-        self.queue = asyncio.Queue()
+        self.client_ready = asyncio.Event()  # 本地终端创建后置位，可以生成二维码
+        self.queue = CommandScheduler()
         self.max_strength_A = 0
         self.max_strength_B = 0
         self.current_strength_A = 0
         self.current_strength_B = 0
         self.is_connected = False
+        self._pulse_until = 0.0  # 已下发波形预计播放结束的时间
+        # 断线期间的指令缓存，复用调度器的强度合并和波形过期逻辑
+        self._held = CommandScheduler()
+        self.replay_stats = {"held": 0, "replayed": 0, "expired": 0, "dropped": 0}
+        self._replaying = False  # 重发缓存期间新指令继续进入缓存，保证不会被旧指令覆盖
+        self.on_status_change = None  # 强度或连接状态变化时调用
 
     async def start(self):
         """启动DGLab WebSocket服务器"""
-        self.server = DGLabWSServer("0.0.0.0", 5678, 60)
-        self.client = self.server.new_local_client()
-    
-        async with self.server:
+        server = DGLabWSServer(self.host, self.port, 60)
+        async with server:
             print(f"已启动DGLab WebSocket服务器，等待客户端连接...")
-            await self._handle_client()
+            await self.run(server)
+
+    async def run(self, server):
+        """在已启动的服务器上创建本地终端，等待设备绑定并处理指令"""
+        self.server = server
+        self.client = server.new_local_client()
+        self.client_ready.set()
+        await self._handle_client()
 
     async def _handle_client(self):
         """处理客户端连接和数据接收"""
         # 等待绑定
         await self.client.bind()
         self.is_connected = True
+        self._status_changed()
         print(f"已与DGLab设备 {self.client.target_id} 绑定")
         
         # 启动队列监听任务
@@ -64,21 +108,84 @@ class DGLabController:
             self.max_strength_B = data.b_limit
             self.current_strength_A = data.a
             self.current_strength_B = data.b
+            self._status_changed()
         elif isinstance(data, FeedbackButton):
             print(f"收到设备按钮事件: {data.name}")
         elif data == RetCode.CLIENT_DISCONNECTED:
             print("设备已断开连接，尝试重新绑定...")
             self.is_connected = False
+            self._status_changed()
             await self.client.rebind()
+            self._replaying = True
             self.is_connected = True
+            self._status_changed()
+            DEVICE_RECONNECTS.inc()
+            try:
+                await self._replay_held()
+            finally:
+                self._replaying = False
 
     async def _process_queue(self):
         """处理指令队列"""
         while True:
             waveform_data = await self.queue.get()
-            await self._execute_command(waveform_data)
+            if self.is_connected and not self._replaying:
+                try:
+                    await self._execute_command(waveform_data)
+                except Exception as e:
+                    print(f"发送指令失败，重连后重试: {e}")
+                    self._hold(waveform_data)
+            else:
+                # 重发缓存期间设备在线，新指令只是排在缓存之后，不按断线处理
+                self._hold(waveform_data, disconnected=not self.is_connected)
             self.queue.task_done()
 
+    def _status_changed(self):
+        if self.on_status_change is not None:
+            self.on_status_change()
+
+    def _hold(self, cmd, disconnected: bool = True):
+        """缓存指令，缓存已满时丢弃；断线期间的波形使用重连有效期"""
+        if self._held.qsize() >= REPLAY_BUFFER_SIZE:
+            self.replay_stats["dropped"] += 1
+            HELD_DROPPED.inc()
+            return
+        if disconnected and cmd["type"] == "pluse":
+            cmd = {**cmd, "ttl": REPLAY_PULSE_TTL.get(cmd.get("priority", PRIORITY_DEFAULT), 0.0)}
+        self._held.put_nowait(cmd)
+        self.replay_stats["held"] += 1
+
+    async def _replay_held(self):
+        """重连后发送缓存中仍然有效的指令，过期的波形直接丢弃
+
+        重发期间到达的新指令也进入缓存，与尚未发送的旧指令合并，
+        一直发送到缓存为空才恢复正常发送，最终生效的总是最新的强度
+        """
+        expired = self._held.stats["expired"]
+        replayed = 0
+        while self.is_connected:
+            try:
+                cmd = self._held.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            try:
+                await self._execute_command(cmd)
+            except Exception as e:
+                # 重发期间再次断线：指令放回缓存，等下次重新绑定后继续
+                print(f"重发指令失败，重连后重试: {e}")
+                self.is_connected = False
+                self._status_changed()
+                self._held.put_back(cmd)
+                break
+            replayed += 1
+        expired = self._held.stats["expired"] - expired
+        self.replay_stats["replayed"] += replayed
+        self.replay_stats["expired"] += expired
+        HELD_REPLAYED.inc(replayed)
+        HELD_EXPIRED.inc(expired)
+        if replayed or expired:
+            print(f"重连后重发 {replayed} 条指令，{expired} 条已过期")
+
     async def _execute_command(self, cmd):
         """执行振动指令"""
         if not self.client or not self.is_connected:
@@ -87,17 +194,29 @@ class DGLabController:
         data = cmd["data"]
         
         if cmd_type == "pluse":
-            await self.client.add_pulses(Channel.A, *(data * 1))
-            await self.client.add_pulses(Channel.B, *(data * 1))
+            # data为ConfigManager预编译的波形元组，两个通道共用同一对象
+            await self.client.add_pulses(Channel.A, *data)
+            await self.client.add_pulses(Channel.B, *data)
+            self._pulse_until = max(self._pulse_until, time.monotonic()) + len(data) * PULSE_FRAME_DURATION
         elif cmd_type == "strlup":
             channel = Channel.A if cmd["chose"] == "a" else Channel.B
             await self.client.set_strength(channel, StrengthOperationType.INCREASE, data)
         elif cmd_type == "strlse":
-            await self.client.set_strength(Channel.A, StrengthOperationType.DECREASE, 200)
-            await self.client.set_strength(Channel.B, StrengthOperationType.DECREASE, 200)
+            # 未指定通道时同时释放两个通道
+            if cmd.get("chose") != "b":
+                await self.client.set_strength(Channel.A, StrengthOperationType.DECREASE, 200)
+            if cmd.get("chose") != "a":
+                await self.client.set_strength(Channel.B, StrengthOperationType.DECREASE, 200)
         elif cmd_type == "strlst":
             channel = Channel.A if cmd["chose"] == "a" else Channel.B
             await self.client.set_strength(channel, StrengthOperationType.SET_TO, data)
+        else:
+            return
+        COMMANDS_SENT_BY_TYPE[cmd_type].inc()
+
+    def pulse_backlog_frames(self) -> float:
+        """估算App波形队列中尚未播放的帧数"""
+        return max(0.0, self._pulse_until - time.monotonic()) / PULSE_FRAME_DURATION
 
     async def send_command(self, cmd):
         """发送指令到队列"""
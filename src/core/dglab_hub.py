@@ -0,0 +1,46 @@
+import asyncio
+from pydglab_ws import DGLabWSServer
+from src.core.dglab_controller import DGLabController
+
+
+class DGLabHub:
+    """在同一个WebSocket服务器上托管多个DGLab设备
+
+    每个设备有独立的本地终端（独立的二维码绑定）和指令队列，
+    全部运行在同一个事件循环中，一台设备发送缓慢不会拖慢其他设备
+    """
+
+    def __init__(self, ip_address: str, host: str = "0.0.0.0", port: int = 5678, device_count: int = 1):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.devices = [DGLabController(ip_address, host, port) for _ in range(max(1, device_count))]
+
+    @property
+    def ip_address(self) -> str:
+        return self.devices[0].ip_address
+
+    @ip_address.setter
+    def ip_address(self, value: str):
+        for device in self.devices:
+            device.ip_address = value
+
+    @property
+    def ready(self) -> bool:
+        """所有设备的本地终端都已创建，可以生成二维码"""
+        return all(device.client is not None for device in self.devices)
+
+    async def wait_ready(self):
+        """等待所有设备的本地终端创建完成"""
+        await asyncio.gather(*(device.client_ready.wait() for device in self.devices))
+
+    @property
+    def connected_count(self) -> int:
+        return sum(1 for device in self.devices if device.is_connected)
+
+    async def start(self):
+        """启动DGLab WebSocket服务器并为每个设备创建终端"""
+        self.server = DGLabWSServer(self.host, self.port, 60)
+        async with self.server:
+            print(f"已启动DGLab WebSocket服务器，等待{len(self.devices)}个设备连接...")
+            await asyncio.gather(*(device.run(self.server) for device in self.devices))
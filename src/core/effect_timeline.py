@@ -0,0 +1,89 @@
+import asyncio
+import heapq
+import itertools
+
+from src.core.clock import SYSTEM_CLOCK
+
+
+class EffectTimeline:
+    """效果时间线：所有延时效果共用一个后台任务调度，不阻塞请求处理"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self._heap = []  # [到期时间, 序号, 标签, 回调, 是否有效]
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+
+    def schedule(self, delay: float, callback, tag: str = None):
+        """在delay秒后执行回调（普通函数或协程函数），返回可用于取消的条目"""
+        entry = [self.clock.time() + delay, next(self._seq), tag, callback, True]
+        heapq.heappush(self._heap, entry)
+        self._ensure_running()
+        # 新条目可能比当前等待的更早到期，唤醒调度任务重新计算
+        self._wakeup.set()
+        return entry
+
+    def cancel(self, tag: str = None) -> int:
+        """取消指定标签的待执行效果，tag为None时取消全部，返回取消数量"""
+        cancelled = 0
+        for entry in self._heap:
+            if entry[4] and (tag is None or entry[2] == tag):
+                entry[4] = False
+                cancelled += 1
+        return cancelled
+
+    @property
+    def pending(self) -> int:
+        """待执行的效果数量"""
+        return sum(1 for entry in self._heap if entry[4])
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """调度循环：等待最早到期的条目并执行"""
+        while True:
+            # 丢弃已取消的条目
+            while self._heap and not self._heap[0][4]:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            delay = self._heap[0][0] - self.clock.time()
+            if delay > 0:
+                # 等到最早的条目到期，或有更早的新条目加入
+                sleeper = asyncio.ensure_future(self.clock.sleep(delay))
+                waker = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait((sleeper, waker), return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    # 调度任务被取消时也要取消两个等待任务，否则关闭时留下未完成的任务
+                    sleeper.cancel()
+                    waker.cancel()
+                self._wakeup.clear()
+                continue
+
+            entry = heapq.heappop(self._heap)
+            try:
+                result = entry[3]()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"执行延时效果出错: {e}")
+
+    async def close(self):
+        """取消全部效果并停止调度任务"""
+        self.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
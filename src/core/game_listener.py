@@ -1,25 +1,71 @@
 from aiohttp import web
-import asyncio
+import hmac
+import json
+import time
+from src.core.player_session import PlayerSession
+from src.core.player_snapshot import PlayerSnapshot
+from src.utils.gsi_recorder import GsiRecorder
+from src.utils.metrics import Counter, Histogram
+
+GSI_PAYLOADS = Counter("cs2dglab_gsi_payloads_total", "收到的GSI数据条数", ("result",))
+GSI_PROCESSED = GSI_PAYLOADS.labels("processed")  # 触发了模式逻辑
+GSI_IGNORED = GSI_PAYLOADS.labels("ignored")  # 未绑定的玩家或状态无变化
+GSI_INVALID = GSI_PAYLOADS.labels("invalid")  # 缺少必需的数据块
+GSI_MALFORMED = GSI_PAYLOADS.labels("malformed")  # 无法解析或结构错误
+GSI_UNAUTHORIZED = GSI_PAYLOADS.labels("unauthorized")  # 令牌不匹配
+GSI_TOO_LARGE = GSI_PAYLOADS.labels("too_large")  # 超过大小上限
+GSI_FAILED = GSI_PAYLOADS.labels("error")  # 处理时抛出异常
+GSI_HANDLER_SECONDS = Histogram("cs2dglab_gsi_handler_seconds", "GSI请求从读取到处理完成的耗时")
+
+try:
+    # orjson直接解析bytes，比json.loads快数倍；未安装时使用标准库
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# 绑定到该steamid的玩家会话接收任意本机玩家的数据
+LOCAL_PLAYER = ""
+
+# 影响所有玩家的数据块，变化时每个绑定玩家都需要重新检查
+SHARED_BLOCKS = ("round", "map")
 
 class GameStateListener:
-    def __init__(self, config_manager, command_queue, dglab_controller):
+    """接收CS2的GSI数据，按player.steamid路由给对应玩家的会话"""
+
+    def __init__(self, config_manager, command_queue=None, dglab_controller=None, clock=None):
         self.config = config_manager
-        self.command_queue = command_queue
-        self.health = 0  # 初始血量
-        self.app = self._create_app()
-        self.player_status = "正常"
-        self.round_status = "准备中"
-        self.dglab_controller = dglab_controller
-        
-        # 挑战模式相关变量
-        self.challenge_mode_current_strength = 0
-        self.kills = 0  # 击杀数
-        self.last_kills = 0  # 上次击杀数
+        self.clock = clock
+        # 请求体上限在创建应用时确定，修改后需要重启
+        self.app = self._create_app(self.config.snapshot.gsi_max_body)
+        self._runner = None
+        self.sessions = {}  # steamid -> PlayerSession
+        self._local_steamid = None  # 本机玩家会话锁定的steamid，第一次收到未绑定玩家的数据时确定
+        self.on_status_change = None  # 会话处理了数据（玩家状态可能变化）时调用
+
+        # 配置了记录路径时记录原始GSI数据，供回放工具使用
+        record_path = self.config.get("gsi_record_path")
+        self.recorder = GsiRecorder(record_path) if record_path else None
+
+        # 兼容单设备用法：直接传入队列和控制器时绑定本机玩家
+        if command_queue is not None:
+            self.add_player(LOCAL_PLAYER, command_queue, dglab_controller)
+
+    def add_player(self, steamid, command_queue, dglab_controller, name: str = "") -> PlayerSession:
+        """为玩家创建会话并绑定到设备，steamid为空时跟随本机玩家"""
+        session = PlayerSession(steamid, self.config, command_queue, dglab_controller, self.clock, name)
+        self.sessions[steamid] = session
+        return session
 
-    def _create_app(self):
+    @property
+    def primary(self):
+        """第一个绑定的玩家会话，用于界面显示"""
+        return next(iter(self.sessions.values()), None)
+
+    def _create_app(self, max_body: int):
         """创建HTTP应用"""
-        app = web.Application()
-        app["queue"] = self.command_queue
+        app = web.Application(client_max_size=max_body)
         app.router.add_post("", self.handle_game_state)
         return app
 
@@ -29,381 +75,184 @@ class GameStateListener:
         await runner.setup()
         site = web.TCPSite(runner, host, port)
         await site.start()
+        self._runner = runner
         print(f"游戏状态监听服务器已启动: http://{host}:{port}")
 
+    async def stop(self):
+        """停止HTTP服务器、各玩家的效果并关闭记录文件"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        for session in self.sessions.values():
+            await session.close()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
     async def handle_game_state(self, request):
         """处理游戏状态POST请求"""
+        started = time.perf_counter()
         try:
-            data = await request.json()
-            if not data:
+            cfg = self.config.snapshot
+            # 声明的长度超过上限时不读取请求体
+            if request.content_length is not None and request.content_length > cfg.gsi_max_body:
+                GSI_TOO_LARGE.inc()
+                return web.json_response({"status": "error", "message": "请求过大"}, status=413)
+            try:
+                body = await request.read()
+            except web.HTTPRequestEntityTooLarge:
+                GSI_TOO_LARGE.inc()
+                return web.json_response({"status": "error", "message": "请求过大"}, status=413)
+            if not body:
+                GSI_INVALID.inc()
                 return web.json_response({"status": "error", "message": "空请求"}, status=400)
+            try:
+                data = loads(body)
+            except ValueError:
+                GSI_MALFORMED.inc()
+                return web.json_response({"status": "error", "message": "JSON解析失败"}, status=400)
+            if cfg.gsi_token and not self._authorized(data, cfg.gsi_token):
+                GSI_UNAUTHORIZED.inc()
+                return web.json_response({"status": "error", "message": "令牌无效"}, status=401)
+            if self.recorder:
+                self.recorder.record(body.decode("utf-8", errors="replace"), data)
+            try:
+                error = await self.process_payload(data)
+            except Exception:
+                # 处理逻辑的异常交给aiohttp记录完整堆栈并返回500
+                GSI_FAILED.inc()
+                raise
+            if error:
+                return web.json_response({"status": "error", "message": error}, status=400)
+            return web.json_response({"status": "success"})
+        finally:
+            GSI_HANDLER_SECONDS.observe(time.perf_counter() - started)
 
-            # 验证数据格式
-            if "player" not in data or "map" not in data:
-                return web.json_response({"status": "error", "message": "数据格式错误"}, status=400)
-            #必须为当前玩家状态才处理
-            if data["provider"]["steamid"] == data["player"]["steamid"]:
-                # 处理玩家状态
-                await self._process_player_state(data)
-                return web.json_response({"status": "success"})
-        except Exception as e:
-            print(f"处理游戏状态出错: {e}")
-            return web.json_response({"status": "error", "message": str(e)}, status=500)
+    @staticmethod
+    def _authorized(data, token: str) -> bool:
+        """校验GSI数据auth块中的令牌"""
+        auth = data.get("auth") if isinstance(data, dict) else None
+        received = auth.get("token") if isinstance(auth, dict) else None
+        return isinstance(received, str) and hmac.compare_digest(received.encode(), token.encode())
 
-    async def _process_player_state(self, data):
-        """处理玩家状态数据"""
-        # 根据模式选择处理方式
-        mode = self.config.get("mode", "normal")
-        if mode == "fixed":
-            await self._process_player_state_fixed_mode(data)
-        elif mode == "challenge":
-            await self._process_player_state_challenge_mode(data)
-        else:
-            await self._process_player_state_normal_mode(data)
+    async def process_payload(self, data):
+        """校验并处理一条GSI数据，数据无效时返回错误信息"""
+        if not data:
+            GSI_INVALID.inc()
+            return "空请求"
+        if not isinstance(data, dict):
+            GSI_MALFORMED.inc()
+            return "数据格式错误"
 
-    async def _process_player_state_normal_mode(self, data):
-        """处理普通模式下的玩家状态数据"""
-        player_data = data["player"]
-        now_health = player_data["state"]["health"]
-        flash = player_data["state"]["flashed"]
-        smoke = player_data["state"]["smoked"]
-        burning = player_data["state"]["burning"]
-        
-        # 更新状态显示
-        self._update_status_text(now_health, flash, smoke, burning, data)
-        
-        # 处理血量变化（受伤效果）
-        if now_health < self.health and self.config.get("enable_hit", 1) == 1:
-            await self._handle_health_change_normal(now_health)
-        
-        # 处理异常状态（添加开关判断）
-        if flash > 0 and self.config.get("enable_flash", 1) == 1:
-            await self._send_pulse_normal("傻瓜蛋")
-        if smoke > 0 and self.config.get("enable_smoke", 1) == 1:
-            await self._send_pulse_normal("烟雾弹")
-        if burning > 0 and self.config.get("enable_burn", 1) == 1:
-            await self._send_pulse_normal("烧伤")
+        # 验证数据格式
+        if "map" not in data or ("player" not in data and "allplayers" not in data):
+            GSI_INVALID.inc()
+            return "数据格式错误"
+        provider = data.get("provider")
+        player = data.get("player")
+        if (not isinstance(provider, dict) or not isinstance(data["map"], dict)
+                or not isinstance(data.get("round", {}), dict)
+                or (player is not None and not self._valid_player(player))):
+            GSI_MALFORMED.inc()
+            return "数据格式错误"
 
-        # 处理死亡状态（添加开关判断）
-        if now_health == 0 and self.health > 0 and self.config.get("enable_death", 1) == 1:
-            await self._handle_death_normal()
+        if "allplayers" in data and self.config.snapshot.observer_mode:
+            allplayers = data["allplayers"]
+            if not isinstance(allplayers, dict) or not all(map(self._valid_player, allplayers.values())):
+                GSI_MALFORMED.inc()
+                return "数据格式错误"
+            processed = await self._process_observer(data)
+        elif player is None or player.get("steamid") != provider.get("steamid"):
+            # 不是本机玩家自己的状态（观战、死亡后跟随视角），不进入会话处理
+            processed = False
         else:
-            self.health = now_health
-            
-        # 处理回合状态
-        await self._handle_round_status_normal(data)
-
-    async def _process_player_state_fixed_mode(self, data):
-        """处理固定强度模式下的玩家状态数据"""
-        player_data = data["player"]
-        now_health = player_data["state"]["health"]
-        flash = player_data["state"]["flashed"]
-        smoke = player_data["state"]["smoked"]
-        burning = player_data["state"]["burning"]
-        
-        # 更新状态显示
-        self._update_status_text(now_health, flash, smoke, burning, data)
-        
-        # 处理血量变化（受伤效果）
-        if now_health < self.health and self.config.get("enable_hit", 1) == 1:
-            await self._handle_health_change_fixed(now_health)
-        
-        # 处理异常状态（添加开关判断）
-        if flash > 0 and self.config.get("enable_flash", 1) == 1:
-            await self._send_pulse_fixed("傻瓜蛋")
-        if smoke > 0 and self.config.get("enable_smoke", 1) == 1:
-            await self._send_pulse_fixed("烟雾弹")
-        if burning > 0 and self.config.get("enable_burn", 1) == 1:
-            await self._send_pulse_fixed("烧伤")
-
-        # 处理死亡状态（添加开关判断）
-        if now_health == 0 and self.health > 0 and self.config.get("enable_death", 1) == 1:
-            await self._handle_death_fixed()
+            session = self._route(player)
+            processed = session is not None and await session.process(data)
+        if processed:
+            GSI_PROCESSED.inc()
+            if self.on_status_change is not None:
+                self.on_status_change()
         else:
-            self.health = now_health
-            
-        # 处理回合状态
-        await self._handle_round_status_fixed(data)
-
-    async def _process_player_state_challenge_mode(self, data):
-        if "player" not in data or "state" not in data["player"]:
-            # 当检测不到state数据时重置挑战模式相关数据
-            self.challenge_mode_current_strength = 0
-            self.kills = 0
-            self.last_kills = 0
-            self.health = 0
-            return
-        """处理挑战模式下的玩家状态数据"""
-        player_data = data["player"]
-        now_health = player_data["state"]["health"]
-        flash = player_data["state"]["flashed"]
-        smoke = player_data["state"]["smoked"]
-        burning = player_data["state"]["burning"]
-        
-        # 初始化挑战模式强度
-        if self.challenge_mode_current_strength == 0:
-            self.challenge_mode_current_strength = int(self.config.get("challenge_mode_initial_strength", 30))
-            await self._set_strength_by_percentage(self.challenge_mode_current_strength)
-        
-        # 更新状态显示
-        self._update_status_text(now_health, flash, smoke, burning, data)
-        
-        # 处理击杀数变化（挑战模式）
-        if "state" in player_data and "round_kills" in player_data["state"]:
-            current_kills = player_data["state"]["round_kills"]
-            if current_kills > self.last_kills:
-                
-                # 玩家击杀增加，减少强度（基于当前最大强度的百分比）
-                kill_reduction_percent = int(self.config.get("challenge_mode_kill_reduction", 10))
-                # 计算基于当前最大强度A的减少量
-                kill_reduction_a = int(self.dglab_controller.max_strength_A * kill_reduction_percent / 100)
-                # 计算基于当前最大强度B的减少量
-                kill_reduction_b = int(self.dglab_controller.max_strength_B * kill_reduction_percent / 100)
-                
-                # 转换为当前强度的百分比减少
-                if self.dglab_controller.max_strength_A > 0:
-                    actual_reduction_percent_a = int((kill_reduction_a / self.dglab_controller.max_strength_A) * 100)
-                else:
-                    actual_reduction_percent_a = kill_reduction_percent
-                    
-                if self.dglab_controller.max_strength_B > 0:
-                    actual_reduction_percent_b = int((kill_reduction_b / self.dglab_controller.max_strength_B) * 100)
-                else:
-                    actual_reduction_percent_b = kill_reduction_percent
-                
-                actual_reduction_percent = max(actual_reduction_percent_a, actual_reduction_percent_b)
-                self.challenge_mode_current_strength = max(10, self.challenge_mode_current_strength - actual_reduction_percent)
-                await self._set_strength_by_percentage(self.challenge_mode_current_strength)
-                self.last_kills = current_kills
-                self.kills = current_kills
-            elif current_kills < self.last_kills:
-                # 玩家击杀减少（可能是回合重置），更新击杀数
-                self.last_kills = current_kills
-                self.kills = current_kills
-        
-        # 处理血量变化（受伤效果）
-        if now_health < self.health and self.config.get("enable_hit", 1) == 1:
-            await self._handle_health_change_challenge(now_health)
-        
-        # 处理异常状态（添加开关判断）
-        if flash > 0 and self.config.get("enable_flash", 1) == 1:
-            await self._send_pulse_challenge("傻瓜蛋")
-        if smoke > 0 and self.config.get("enable_smoke", 1) == 1:
-            await self._send_pulse_challenge("烟雾弹")
-        if burning > 0 and self.config.get("enable_burn", 1) == 1:
-            await self._send_pulse_challenge("烧伤")
-
-        # 处理死亡状态（添加开关判断）
-        if now_health == 0 and self.health > 0 and self.config.get("enable_death", 1) == 1:
-            await self._handle_death_challenge()
-        else:
-            self.health = now_health
-            
-        # 处理回合状态
-        await self._handle_round_status_challenge(data)
-
-    async def _handle_health_change_normal(self, new_health):
-        """普通模式下处理血量变化"""
-        health_loss = self.health - new_health
-        
-        # 发送受伤波形
-        await self._send_pulse_normal("受伤")
-        
-        # 调整强度
-        await self._adjust_strength(health_loss)
+            GSI_IGNORED.inc()
+        return None
 
-    async def _handle_health_change_fixed(self, new_health):
-        """固定强度模式下处理血量变化"""
-        health_loss = self.health - new_health
-        
-        # 发送受伤波形（使用固定强度）
-        fixed_strength = int(self.config.get("fixed_mode_strength", 50))
-        await self._send_pulse_with_fixed_strength("受伤", fixed_strength)
+    @staticmethod
+    def _valid_player(player) -> bool:
+        """玩家数据块的结构检查：state为对象，规则读取的字段为整数"""
+        if not isinstance(player, dict):
+            return False
+        state = player.get("state")
+        if state is None:
+            # 没有state表示不在游戏中，会话会据此重置状态
+            return "state" not in player
+        if not isinstance(state, dict):
+            return False
+        for field in PlayerSnapshot.STATE_FIELDS:
+            value = state.get(field, 0)
+            if not isinstance(value, int) or isinstance(value, bool):
+                return False
+        return True
 
-    async def _handle_health_change_challenge(self, new_health):
-        """挑战模式下处理血量变化"""
-        health_loss = self.health - new_health
-        
-        # 发送受伤波形
-        await self._send_pulse_challenge("受伤")
-        
-        # 挑战模式下不需要根据血量损失调整强度，使用固定强度
-        # await self._adjust_strength(health_loss)
+    async def _process_observer(self, data):
+        """观察者数据：只为增量块中出现的已绑定玩家构造单人视图并处理"""
+        allplayers = data["allplayers"]
+        previously = data.get("previously")
+        added = data.get("added")
+        previously = previously if isinstance(previously, dict) else {}
+        added = added if isinstance(added, dict) else {}
+        changed_previously = previously.get("allplayers")
+        changed_added = added.get("allplayers")
+        shared_changed = any(block in previously or block in added for block in SHARED_BLOCKS)
 
-    async def _send_pulse_normal(self, pulse_type):
-        """普通模式下发送指定类型的波形"""
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data[pulse_type]
-        })
+        processed = False
+        for steamid, session in self.sessions.items():
+            entry = allplayers.get(steamid) if steamid else None
+            if not isinstance(entry, dict):
+                continue
+            player_previously = changed_previously.get(steamid) if isinstance(changed_previously, dict) else changed_previously
+            player_added = changed_added.get(steamid) if isinstance(changed_added, dict) else changed_added
+            # 已加载过且本次没有涉及该玩家的增量，跳过
+            if (session.snapshot.primed and not shared_changed
+                    and player_previously is None and player_added is None):
+                continue
+            view = self._player_view(data, steamid, entry, previously, added, player_previously, player_added)
+            processed |= await session.process(view)
+        return processed
 
-    async def _send_pulse_fixed(self, pulse_type):
-        """固定强度模式下发送指定类型的波形"""
-        fixed_strength = int(self.config.get("fixed_mode_strength", 50))
-        await self._send_pulse_with_fixed_strength(pulse_type, fixed_strength)
-
-    async def _send_pulse_challenge(self, pulse_type):
-        """挑战模式下发送指定类型的波形"""
-        # 使用当前挑战模式的强度发送波形
-        await self._set_strength_by_percentage(self.challenge_mode_current_strength)
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data[pulse_type]
-        })
-
-    async def _send_pulse_with_fixed_strength(self, pulse_type, strength_percentage):
-        """在固定强度模式下发送指定类型的波形"""
-        # 先设置固定强度
-        await self._set_strength_by_percentage(strength_percentage)
-        
-        # 然后发送波形
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data[pulse_type]
-        })
-
-    async def _adjust_strength(self, health_loss):
-        """根据血量损失调整强度"""
-        base_ratio = int(health_loss * self.config.hit_strength)
-
-        strength_a = int(base_ratio * self.dglab_controller.max_strength_A / 100)
-        strength_b = int(base_ratio * self.dglab_controller.max_strength_B / 100)
-
-        strength_a = min(strength_a, self.dglab_controller.max_strength_A)
-        strength_b = min(strength_b, self.dglab_controller.max_strength_B)
-
-        # 发送强度调整
-        await self.command_queue.put({
-            "type": "strlup", 
-            "data": strength_a, 
-            "chose": "a"
-        })
-        await self.command_queue.put({
-            "type": "strlup", 
-            "data": strength_b, 
-            "chose": "b"
-        })
-
-    async def _set_strength_by_percentage(self, percentage):
-        """根据百分比设置强度"""
-        strength_a = int(self.dglab_controller.max_strength_A * percentage / 100)
-        strength_b = int(self.dglab_controller.max_strength_B * percentage / 100)
-        
-        await self.command_queue.put({
-            "type": "strlst", 
-            "data": strength_a, 
-            "chose": "a"
-        })
-        await self.command_queue.put({
-            "type": "strlst", 
-            "data": strength_b, 
-            "chose": "b"
-        })
-
-    async def _handle_death_normal(self):
-        """普通模式下处理死亡状态"""
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data["死亡"]
-        })
-        await asyncio.sleep(1)
-        await self.command_queue.put({"type": "strlse", "data": 100})
-        await asyncio.sleep(5)
-        self.health = 100  # 重置血量
-
-    async def _handle_death_fixed(self):
-        """固定强度模式下处理死亡状态"""
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data["死亡"]
-        })
-        await asyncio.sleep(1)
-        # 固定模式下死亡不重置强度
-        await asyncio.sleep(5)
-        self.health = 100  # 重置血量
-
-    async def _handle_death_challenge(self):
-        """挑战模式下处理死亡状态"""
-        await self.command_queue.put({
-            "type": "pluse", 
-            "data": self.config.pulse_data["死亡"]
-        })
-        await asyncio.sleep(1)
-        
-        # 挑战模式下死亡，增加强度（基于当前最大强度的百分比）
-        death_boost_percent = int(self.config.get("challenge_mode_death_boost", 20))
-        # 计算基于当前最大强度A的增加量
-        death_boost_a = int(self.dglab_controller.max_strength_A * death_boost_percent / 100)
-        # 计算基于当前最大强度B的增加量
-        death_boost_b = int(self.dglab_controller.max_strength_B * death_boost_percent / 100)
-        
-        # 转换为当前强度的百分比增加
-        if self.dglab_controller.max_strength_A > 0:
-            actual_boost_percent_a = int((death_boost_a / self.dglab_controller.max_strength_A) * 100)
-        else:
-            actual_boost_percent_a = death_boost_percent
-            
-        if self.dglab_controller.max_strength_B > 0:
-            actual_boost_percent_b = int((death_boost_b / self.dglab_controller.max_strength_B) * 100)
-        else:
-            actual_boost_percent_b = death_boost_percent
-        
-        # 使用两个通道中较大的增加百分比
-        actual_boost_percent = max(actual_boost_percent_a, actual_boost_percent_b)
-        self.challenge_mode_current_strength = min(100, self.challenge_mode_current_strength + actual_boost_percent)
-        await self._set_strength_by_percentage(self.challenge_mode_current_strength)
-            
-        await asyncio.sleep(5)
-        self.health = 100  # 重置血量
-
-    async def _handle_round_status_normal(self, data):
-        """普通模式下处理回合状态"""
+    @staticmethod
+    def _player_view(data, steamid, entry, previously, added, player_previously, player_added):
+        """把allplayers中的一名玩家转换为与本机玩家数据相同结构的视图"""
+        view = {
+            "provider": data.get("provider"),
+            "map": data["map"],
+            "player": {**entry, "steamid": steamid},
+        }
         if "round" in data:
-            if data["round"]["phase"] == "over":
-                await self.command_queue.put({"type": "strlse", "data": 100})
-            # 处理游戏结束
-            if data["map"]["phase"] == "gameover":
-                await self.command_queue.put({"type": "strlse", "data": 100})
+            view["round"] = data["round"]
+        for key, delta, player_delta in (("previously", previously, player_previously), ("added", added, player_added)):
+            block = {name: delta[name] for name in SHARED_BLOCKS if name in delta}
+            if player_delta is not None:
+                block["player"] = player_delta
+            if block:
+                view[key] = block
+        return view
 
-    async def _handle_round_status_fixed(self, data):
-        """固定强度模式下处理回合状态"""
-        if "round" in data:
-            if data["round"]["phase"] == "over":
-                # 固定强度模式不重置强度
-                pass
-            # 处理游戏结束
-            if data["map"]["phase"] == "gameover":
-                # 固定强度模式不重置强度
-                pass
+    def _route(self, player):
+        """找到本机玩家数据对应的会话，没有绑定的玩家返回None
 
-    async def _handle_round_status_challenge(self, data):
-        """挑战模式下处理回合状态"""
-        if "round" in data:
-            if data["round"]["phase"] == "over":
-                # 挑战模式下回合结束不重置强度
-                pass
-            # 处理游戏结束
-            if data["map"]["phase"] == "gameover":
-                # 挑战模式下游戏结束不重置强度
-                pass
-
-    def _update_status_text(self, health, flash, smoke, burning, data):
-        """更新状态文本描述"""
-        status_parts = []
-        if flash > 0:
-            status_parts.append("被闪光")
-        if smoke > 0:
-            status_parts.append("被烟雾")
-        if burning > 0:
-            status_parts.append("被烧伤")
-            
-        if health == 0:
-            self.player_status = "已死亡"
-        elif status_parts:
-            self.player_status = ", ".join(status_parts)
-        else:
-            self.player_status = "正常"
-            
-        # 更新回合状态
-        if "round" in data:
-            self.round_status = data["round"]["phase"]
\ No newline at end of file
+        未绑定的steamid交给本机玩家会话，会话锁定第一个收到的steamid，
+        多台电脑向同一个监听器上报时其他玩家的数据不会混入同一个快照
+        """
+        steamid = player.get("steamid")
+        session = self.sessions.get(steamid)
+        if session is not None:
+            return session
+        session = self.sessions.get(LOCAL_PLAYER)
+        if session is None:
+            return None
+        if self._local_steamid is None:
+            self._local_steamid = steamid
+            print(f"本机玩家会话已绑定steamid {steamid}")
+        elif steamid != self._local_steamid:
+            return None
+        return session
@@ -0,0 +1,221 @@
+from src.core.effect_timeline import EffectTimeline
+from src.core.player_snapshot import PlayerSnapshot
+from src.core.status_effects import StatusEffectEngine
+from src.core.strength_controller import StrengthController
+from src.core.command_scheduler import PRIORITY_DEATH, PRIORITY_HIT, PRIORITY_STATUS
+from src.config.config_manager import Mode
+from src.core.rules import ruleset_for
+
+# 持续状态效果：快照字段 -> (波形名称, 开关配置项)
+STATUS_EFFECTS = (
+    ("flashed", "傻瓜蛋", "enable_flash"),
+    ("smoked", "烟雾弹", "enable_smoke"),
+    ("burning", "烧伤", "enable_burn"),
+)
+
+# 波形对应的调度优先级：死亡 > 受伤 > 闪光/烧伤/烟雾
+PULSE_PRIORITY = {
+    "死亡": PRIORITY_DEATH,
+    "受伤": PRIORITY_HIT,
+}
+
+class PlayerSession:
+    """单个玩家的状态机：跟踪玩家状态并向绑定的设备发送指令
+
+    每个玩家有独立的状态快照、延时效果和持续效果，指令只进入绑定设备自己的队列
+    """
+
+    def __init__(self, steamid, config_manager, command_queue, dglab_controller, clock=None, name=""):
+        self.steamid = steamid  # 为空时跟随本机玩家
+        self.name = name
+        self.config = config_manager
+        self.command_queue = command_queue
+        self.dglab_controller = dglab_controller
+        self.health = 0  # 初始血量
+        self.player_status = "正常"
+        self.round_status = "准备中"
+
+        # 挑战模式相关变量
+        self.challenge_mode_current_strength = 0
+        self.kills = 0  # 击杀数
+        self.last_kills = 0  # 上次击杀数
+
+        # 延时效果时间线（死亡后的释放强度、重置血量等）
+        self.timeline = EffectTimeline(clock)
+
+        # 闪光/烟雾/燃烧的持续效果
+        self.effects = StatusEffectEngine(command_queue, config_manager, dglab_controller, clock)
+
+        # 受伤强度的节拍控制器（普通模式）
+        self.strength = StrengthController(command_queue, config_manager, dglab_controller, clock)
+
+        # 玩家状态快照，只对发生变化的字段执行模式逻辑
+        self.snapshot = PlayerSnapshot()
+        self.changed = ()  # 正在处理的数据中发生变化的字段
+
+    async def close(self):
+        """停止持续效果、强度控制和延时效果"""
+        self.effects.clear()
+        await self.strength.close()
+        await self.timeline.close()
+
+    async def process(self, data):
+        """处理该玩家的一条GSI数据，返回是否执行了模式逻辑"""
+        mode = self.config.snapshot.mode
+        if "state" not in data["player"]:
+            if mode is Mode.CHALLENGE:
+                # 当检测不到state数据时重置挑战模式相关数据
+                self.challenge_mode_current_strength = 0
+                self.kills = 0
+                self.last_kills = 0
+                self.health = 0
+            return False
+
+        changed = self.snapshot.apply(data)
+        if not changed:
+            return False
+        self.changed = changed
+
+        # 新回合开始时取消上一回合遗留的延时效果
+        if "round_phase" in changed and self.snapshot.round_phase == "freezetime":
+            self.timeline.cancel()
+            self.effects.clear()
+        # 死亡后停止持续效果
+        elif "health" in changed and self.snapshot.health == 0:
+            self.effects.clear()
+
+        # 更新状态显示
+        self._update_status_text()
+
+        # 执行当前模式的规则，只检查输入字段有变化的规则
+        cfg = self.config.snapshot
+        await ruleset_for(cfg.mode).run(self, changed, cfg)
+        self.health = self.snapshot.health
+        return True
+
+    # 以下为规则动作使用的接口
+
+    def update_status_effects(self, cfg) -> bool:
+        """把本条数据中变化的闪光/烟雾/燃烧数值交给持续效果引擎，返回是否有效果刚开始"""
+        started = False
+        for field, pulse_type, switch in STATUS_EFFECTS:
+            if field in self.changed:
+                magnitude = getattr(self.snapshot, field) if getattr(cfg, switch) else 0
+                started |= self.effects.set(field, magnitude, cfg.pulse_data[pulse_type])
+        return started
+
+    async def send_pulse(self, pulse_type, data=None):
+        """发送波形，附带调度优先级；未指定data时使用配置中的波形"""
+        await self.command_queue.put({
+            "type": "pluse",
+            "data": data if data is not None else self.config.snapshot.pulse_data[pulse_type],
+            "priority": PULSE_PRIORITY.get(pulse_type, PRIORITY_STATUS)
+        })
+
+    async def add_damage_strength(self, health_loss):
+        """根据血量损失调整强度"""
+        base_ratio = int(health_loss * self.config.snapshot.hit_strength)
+
+        strength_a = int(base_ratio * self.dglab_controller.max_strength_A / 100)
+        strength_b = int(base_ratio * self.dglab_controller.max_strength_B / 100)
+
+        strength_a = min(strength_a, self.dglab_controller.max_strength_A)
+        strength_b = min(strength_b, self.dglab_controller.max_strength_B)
+
+        # 合并到强度控制器的目标，由节拍任务发送净变化
+        self.strength.add(strength_a, strength_b)
+
+    async def set_strength_percentage(self, percentage):
+        """根据百分比设置强度"""
+        self.strength.clear()
+        strength_a = int(self.dglab_controller.max_strength_A * percentage / 100)
+        strength_b = int(self.dglab_controller.max_strength_B * percentage / 100)
+        
+        await self.command_queue.put({
+            "type": "strlst", 
+            "data": strength_a, 
+            "chose": "a"
+        })
+        await self.command_queue.put({
+            "type": "strlst", 
+            "data": strength_b, 
+            "chose": "b"
+        })
+
+    async def apply_kill_reduction(self):
+        """挑战模式下击杀后降低强度"""
+        # 玩家击杀增加，减少强度（基于当前最大强度的百分比）
+        kill_reduction_percent = self.config.snapshot.challenge_mode_kill_reduction
+        # 计算基于当前最大强度A的减少量
+        kill_reduction_a = int(self.dglab_controller.max_strength_A * kill_reduction_percent / 100)
+        # 计算基于当前最大强度B的减少量
+        kill_reduction_b = int(self.dglab_controller.max_strength_B * kill_reduction_percent / 100)
+        
+        # 转换为当前强度的百分比减少
+        if self.dglab_controller.max_strength_A > 0:
+            actual_reduction_percent_a = int((kill_reduction_a / self.dglab_controller.max_strength_A) * 100)
+        else:
+            actual_reduction_percent_a = kill_reduction_percent
+            
+        if self.dglab_controller.max_strength_B > 0:
+            actual_reduction_percent_b = int((kill_reduction_b / self.dglab_controller.max_strength_B) * 100)
+        else:
+            actual_reduction_percent_b = kill_reduction_percent
+        
+        actual_reduction_percent = max(actual_reduction_percent_a, actual_reduction_percent_b)
+        self.challenge_mode_current_strength = max(10, self.challenge_mode_current_strength - actual_reduction_percent)
+        await self.set_strength_percentage(self.challenge_mode_current_strength)
+        self.last_kills = self.snapshot.round_kills
+        self.kills = self.snapshot.round_kills
+
+    async def apply_death_boost(self):
+        """挑战模式下死亡后增加强度"""
+        # 挑战模式下死亡，增加强度（基于当前最大强度的百分比）
+        death_boost_percent = self.config.snapshot.challenge_mode_death_boost
+        # 计算基于当前最大强度A的增加量
+        death_boost_a = int(self.dglab_controller.max_strength_A * death_boost_percent / 100)
+        # 计算基于当前最大强度B的增加量
+        death_boost_b = int(self.dglab_controller.max_strength_B * death_boost_percent / 100)
+        
+        # 转换为当前强度的百分比增加
+        if self.dglab_controller.max_strength_A > 0:
+            actual_boost_percent_a = int((death_boost_a / self.dglab_controller.max_strength_A) * 100)
+        else:
+            actual_boost_percent_a = death_boost_percent
+            
+        if self.dglab_controller.max_strength_B > 0:
+            actual_boost_percent_b = int((death_boost_b / self.dglab_controller.max_strength_B) * 100)
+        else:
+            actual_boost_percent_b = death_boost_percent
+        
+        # 使用两个通道中较大的增加百分比
+        actual_boost_percent = max(actual_boost_percent_a, actual_boost_percent_b)
+        self.challenge_mode_current_strength = min(100, self.challenge_mode_current_strength + actual_boost_percent)
+        await self.set_strength_percentage(self.challenge_mode_current_strength)
+
+    async def release_strength(self):
+        """释放两个通道的强度"""
+        self.strength.clear()
+        await self.command_queue.put({"type": "strlse", "data": 100})
+
+    def _update_status_text(self):
+        """根据状态快照更新状态文本描述"""
+        snapshot = self.snapshot
+        status_parts = []
+        if snapshot.flashed > 0:
+            status_parts.append("被闪光")
+        if snapshot.smoked > 0:
+            status_parts.append("被烟雾")
+        if snapshot.burning > 0:
+            status_parts.append("被烧伤")
+            
+        if snapshot.health == 0:
+            self.player_status = "已死亡"
+        elif status_parts:
+            self.player_status = ", ".join(status_parts)
+        else:
+            self.player_status = "正常"
+            
+        # 更新回合状态
+        if snapshot.round_phase is not None:
+            self.round_status = snapshot.round_phase
\ No newline at end of file
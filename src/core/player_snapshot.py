@@ -0,0 +1,94 @@
+class PlayerSnapshot:
+    """本地玩家状态快照，根据CS2的previously/added增量块更新"""
+
+    __slots__ = (
+        "steamid",
+        "health",
+        "flashed",
+        "smoked",
+        "burning",
+        "round_kills",
+        "round_phase",
+        "map_phase",
+        "primed",
+    )
+
+    # player.state中关注的字段
+    STATE_FIELDS = ("health", "flashed", "smoked", "burning", "round_kills")
+    NO_CHANGE = frozenset()
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空快照，下一次apply时完整加载"""
+        self.steamid = None
+        self.health = 0
+        self.flashed = 0
+        self.smoked = 0
+        self.burning = 0
+        self.round_kills = 0
+        self.round_phase = None
+        self.map_phase = None
+        self.primed = False
+
+    def apply(self, data: dict):
+        """应用一次GSI数据，返回实际发生变化的字段名集合"""
+        player = data.get("player", {})
+        if not self.primed or player.get("steamid") != self.steamid:
+            return self._load(data)
+
+        previously = data.get("previously")
+        added = data.get("added")
+        # 心跳包不含增量块，直接短路
+        if not previously and not added:
+            return self.NO_CHANGE
+
+        state_fields = set()
+        read_round = read_map = False
+        for delta in (previously, added):
+            if not isinstance(delta, dict):
+                continue
+            if "player" in delta:
+                delta_player = delta["player"]
+                delta_state = delta_player.get("state") if isinstance(delta_player, dict) else True
+                if isinstance(delta_state, dict):
+                    state_fields.update(delta_state.keys())
+                elif delta_state is not None:
+                    state_fields.update(self.STATE_FIELDS)
+            if "round" in delta:
+                read_round = True
+            if "map" in delta:
+                read_map = True
+
+        changed = set()
+        state = player.get("state", {})
+        for field in self.STATE_FIELDS:
+            if field in state_fields and field in state:
+                value = state[field]
+                if value != getattr(self, field):
+                    setattr(self, field, value)
+                    changed.add(field)
+        if read_round:
+            self._set_phase("round_phase", data.get("round"), changed)
+        if read_map:
+            self._set_phase("map_phase", data.get("map"), changed)
+        return changed
+
+    def _load(self, data: dict):
+        """完整加载一次数据，所有字段视为已变化"""
+        player = data.get("player", {})
+        state = player.get("state", {})
+        self.steamid = player.get("steamid")
+        for field in self.STATE_FIELDS:
+            setattr(self, field, state.get(field, 0))
+        self.round_phase = (data.get("round") or {}).get("phase")
+        self.map_phase = (data.get("map") or {}).get("phase")
+        self.primed = True
+        return set(self.STATE_FIELDS) | {"round_phase", "map_phase"}
+
+    def _set_phase(self, field: str, section, changed: set):
+        value = section.get("phase") if isinstance(section, dict) else None
+        if value != getattr(self, field):
+            setattr(self, field, value)
+            changed.add(field)
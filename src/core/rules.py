@@ -0,0 +1,266 @@
+"""模式规则：触发条件（字段变化） -> 动作（波形、强度策略、延时效果）
+
+三种模式以内置规则集的形式声明，首次使用时编译成按字段索引的分发表，
+每条数据只检查其输入字段发生了变化的规则，规则按声明顺序执行。
+"""
+from src.config.config_manager import Mode
+from src.core import waveform_synth
+
+# 死亡后释放强度的延时（秒）
+DEATH_RELEASE_DELAY = 1
+
+STATUS_FIELDS = ("flashed", "smoked", "burning")
+# 会话本身用到的字段：死亡和新回合时清理效果
+SESSION_FIELDS = ("health", "round_phase")
+PHASE_FIELDS = ("round_phase", "map_phase")
+
+# 快照字段来自的GSI数据块，用于只订阅规则用到的数据
+FIELD_SECTIONS = {
+    "health": "player_state",
+    "flashed": "player_state",
+    "smoked": "player_state",
+    "burning": "player_state",
+    "round_kills": "player_state",
+    "round_phase": "round",
+    "map_phase": "map",
+}
+
+
+# 触发条件：名称 -> (关注的字段, 判断函数)，字段为空表示每条有变化的数据都检查
+TRIGGERS = {
+    "challenge_unset": ((), lambda session, changed, cfg: session.challenge_mode_current_strength == 0),
+    "kills_up": (("round_kills",), lambda session, changed, cfg: session.snapshot.round_kills > session.last_kills),
+    "kills_down": (("round_kills",), lambda session, changed, cfg: session.snapshot.round_kills < session.last_kills),
+    "health_drop": (("health",), lambda session, changed, cfg: session.snapshot.health < session.health),
+    # 只在闪光/烟雾/燃烧数值变化时检查，由status_effects动作更新持续效果
+    "status_change": (STATUS_FIELDS, lambda session, changed, cfg: True),
+    "death": (("health",), lambda session, changed, cfg: session.snapshot.health == 0 and session.health > 0),
+    "round_over": (PHASE_FIELDS, lambda session, changed, cfg: session.snapshot.round_phase == "over"),
+    "gameover": (PHASE_FIELDS, lambda session, changed, cfg: (
+        session.snapshot.round_phase is not None and session.snapshot.map_phase == "gameover")),
+}
+
+
+def _strength_percentage(policy: str, session, cfg) -> int:
+    """强度策略：fixed为配置的固定强度，challenge为当前挑战强度"""
+    if policy == "fixed":
+        return cfg.fixed_mode_strength
+    return session.challenge_mode_current_strength
+
+
+def _pulse(name):
+    async def action(session, cfg):
+        await session.send_pulse(name)
+    return action
+
+
+def _hit_pulse():
+    async def action(session, cfg):
+        # 开启波形合成时强度随损失血量变化，否则使用配置中的受伤波形
+        data = waveform_synth.hit_pulse(session.health - session.snapshot.health) if cfg.synth_pulses else None
+        await session.send_pulse("受伤", data)
+    return action
+
+
+def _death_pulse():
+    async def action(session, cfg):
+        data = waveform_synth.death_pulse(session.snapshot.round_kills) if cfg.synth_pulses else None
+        await session.send_pulse("死亡", data)
+    return action
+
+
+def _strength(policy):
+    async def action(session, cfg):
+        await session.set_strength_percentage(_strength_percentage(policy, session, cfg))
+    return action
+
+
+def _strength_by_damage():
+    async def action(session, cfg):
+        await session.add_damage_strength(session.health - session.snapshot.health)
+    return action
+
+
+def _release():
+    async def action(session, cfg):
+        await session.release_strength()
+    return action
+
+
+def _challenge_init():
+    async def action(session, cfg):
+        session.challenge_mode_current_strength = cfg.challenge_mode_initial_strength
+        await session.set_strength_percentage(session.challenge_mode_current_strength)
+    return action
+
+
+def _challenge_kill():
+    async def action(session, cfg):
+        await session.apply_kill_reduction()
+    return action
+
+
+def _sync_kills():
+    async def action(session, cfg):
+        # 击杀数减少（可能是回合重置），只更新记录
+        session.last_kills = session.kills = session.snapshot.round_kills
+    return action
+
+
+def _challenge_death_boost():
+    async def action(session, cfg):
+        await session.apply_death_boost()
+    return action
+
+
+def _status_effects(*on_start):
+    inner = tuple(_compile_action(spec) for spec in on_start)
+
+    async def action(session, cfg):
+        # 持续效果总是按最新数值更新，有效果刚开始时才执行后续动作
+        if session.update_status_effects(cfg):
+            for follow in inner:
+                await follow(session, cfg)
+    return action
+
+
+def _after(delay, spec):
+    inner = _compile_action(spec)
+
+    async def action(session, cfg):
+        # 延时动作执行时读取最新配置
+        session.timeline.schedule(delay, lambda: inner(session, session.config.snapshot), tag="rule")
+    return action
+
+
+# 动作：名称 -> 工厂函数，参数来自规则声明
+ACTIONS = {
+    "pulse": _pulse,
+    "hit_pulse": _hit_pulse,
+    "death_pulse": _death_pulse,
+    "strength": _strength,
+    "strength_by_damage": _strength_by_damage,
+    "release": _release,
+    "challenge_init": _challenge_init,
+    "challenge_kill": _challenge_kill,
+    "sync_kills": _sync_kills,
+    "challenge_death_boost": _challenge_death_boost,
+    "status_effects": _status_effects,
+    "after": _after,
+}
+
+
+def _compile_action(spec):
+    name, *args = spec
+    if name not in ACTIONS:
+        raise ValueError(f"未知的规则动作: {name}")
+    return ACTIONS[name](*args)
+
+
+# 内置规则集：(名称, 触发条件, 开关配置项, 动作列表)
+RULESETS = {
+    Mode.NORMAL: (
+        ("受伤", "health_drop", "enable_hit", (("hit_pulse",), ("strength_by_damage",))),
+        ("持续效果", "status_change", None, (("status_effects",),)),
+        ("死亡", "death", "enable_death", (
+            ("death_pulse",),
+            ("after", DEATH_RELEASE_DELAY, ("release",)),
+        )),
+        ("回合结束", "round_over", None, (("release",),)),
+        ("游戏结束", "gameover", None, (("release",),)),
+    ),
+    Mode.FIXED: (
+        ("受伤", "health_drop", "enable_hit", (("strength", "fixed"), ("hit_pulse",))),
+        ("持续效果", "status_change", None, (("status_effects", ("strength", "fixed")),)),
+        # 固定模式下死亡不重置强度
+        ("死亡", "death", "enable_death", (("death_pulse",),)),
+    ),
+    Mode.CHALLENGE: (
+        ("初始强度", "challenge_unset", None, (("challenge_init",),)),
+        ("击杀", "kills_up", None, (("challenge_kill",),)),
+        ("击杀重置", "kills_down", None, (("sync_kills",),)),
+        ("受伤", "health_drop", "enable_hit", (("strength", "challenge"), ("hit_pulse",))),
+        ("持续效果", "status_change", None, (("status_effects", ("strength", "challenge")),)),
+        ("死亡", "death", "enable_death", (
+            ("death_pulse",),
+            ("after", DEATH_RELEASE_DELAY, ("challenge_death_boost",)),
+        )),
+    ),
+}
+
+
+class Rule:
+    __slots__ = ("order", "name", "trigger", "switch", "actions")
+
+    def __init__(self, order: int, name: str, trigger, switch, actions: tuple):
+        self.order = order
+        self.name = name
+        self.trigger = trigger
+        self.switch = switch
+        self.actions = actions
+
+
+class CompiledRuleSet:
+    """按字段索引的规则分发表"""
+
+    def __init__(self, specs):
+        self.rules = []
+        self.always = []
+        self.by_field = {}
+        for order, (name, trigger_name, switch, actions) in enumerate(specs):
+            if trigger_name not in TRIGGERS:
+                raise ValueError(f"规则 {name} 使用了未知的触发条件: {trigger_name}")
+            fields, trigger = TRIGGERS[trigger_name]
+            rule = Rule(order, name, trigger, switch, tuple(_compile_action(spec) for spec in actions))
+            self.rules.append(rule)
+            if not fields:
+                self.always.append(rule)
+            for field in fields:
+                self.by_field.setdefault(field, []).append(rule)
+
+    def select(self, changed) -> list:
+        """返回输入字段有变化的规则，按声明顺序排列"""
+        selected = set(self.always)
+        for field in changed:
+            rules = self.by_field.get(field)
+            if rules:
+                selected.update(rules)
+        return sorted(selected, key=lambda rule: rule.order)
+
+    async def run(self, session, changed, cfg):
+        for rule in self.select(changed):
+            if rule.switch is not None and not getattr(cfg, rule.switch):
+                continue
+            if not rule.trigger(session, changed, cfg):
+                continue
+            for action in rule.actions:
+                await action(session, cfg)
+
+
+_compiled = {}
+
+
+def required_sections() -> tuple:
+    """会话和所有内置规则集用到的GSI数据块
+
+    取全部模式的并集，运行中切换模式也不会缺少数据。目前的结果就是
+    player_state、round和map（map同时在基础数据块中），只有新增规则用到其他字段时才会变化
+    """
+    fields = list(SESSION_FIELDS)
+    for specs in RULESETS.values():
+        for _, trigger_name, _, _ in specs:
+            fields.extend(TRIGGERS[trigger_name][0])
+    sections = []
+    for field in fields:
+        section = FIELD_SECTIONS[field]
+        if section not in sections:
+            sections.append(section)
+    return tuple(sections)
+
+
+def ruleset_for(mode: Mode) -> CompiledRuleSet:
+    """取出模式对应的已编译规则集，首次使用时编译"""
+    ruleset = _compiled.get(mode)
+    if ruleset is None:
+        ruleset = _compiled[mode] = CompiledRuleSet(RULESETS[mode])
+    return ruleset
@@ -0,0 +1,105 @@
+import asyncio
+
+from src.core.clock import SYSTEM_CLOCK
+from src.config.config_manager import PULSE_FRAME_DURATION
+from src.core.command_scheduler import PRIORITY_STATUS
+from src.core.waveform_synth import INTENSITY_LEVELS
+
+# CS2中flashed/smoked/burning的最大值
+MAX_MAGNITUDE = 255
+
+
+class StatusEffectEngine:
+    """持续状态效果引擎
+
+    闪光、烟雾、燃烧等状态持续期间，按固定节拍下发与状态强度成比例的短波形，
+    状态结束后立即停止；设备中排队的波形帧数不超过配置的上限
+    """
+
+    def __init__(self, command_queue, config_manager, dglab_controller=None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.command_queue = command_queue
+        self.config = config_manager
+        self.dglab_controller = dglab_controller
+        self._effects = {}  # 效果名 -> [强度, 波形, 播放位置]
+        self._task = None
+        self._backlog_until = 0.0  # 本引擎下发的波形预计播放结束的时间
+        self._frame_cache = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self._effects)
+
+    def set(self, name: str, magnitude: int, pulse: tuple) -> bool:
+        """更新效果强度，返回效果是否从无到有开始"""
+        if magnitude <= 0:
+            self._effects.pop(name, None)
+            return False
+        effect = self._effects.get(name)
+        if effect is not None:
+            effect[0] = magnitude
+            effect[1] = pulse
+            return False
+        self._effects[name] = [magnitude, pulse, 0]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    def clear(self):
+        """停止全部效果"""
+        self._effects.clear()
+
+    def backlog_frames(self) -> float:
+        """估算设备队列中尚未播放的波形帧数"""
+        now = self.clock.time()
+        backlog = max(0.0, self._backlog_until - now) / PULSE_FRAME_DURATION
+        if self.dglab_controller is not None:
+            backlog = max(backlog, self.dglab_controller.pulse_backlog_frames())
+        return backlog
+
+    async def _run(self):
+        """节拍循环，没有活动效果时退出"""
+        try:
+            while self._effects:
+                cfg = self.config.snapshot
+                await self._tick(cfg.effect_tick_frames, cfg.effect_horizon_frames)
+                await self.clock.sleep(cfg.effect_tick_frames * PULSE_FRAME_DURATION)
+        finally:
+            self._task = None
+
+    async def _tick(self, tick_frames: int, horizon_frames: int):
+        budget = int(horizon_frames - self.backlog_frames())
+        if budget <= 0:
+            return
+        # 同时存在多个效果时只播放最强的一个，避免叠加排队
+        name = max(self._effects, key=lambda key: self._effects[key][0])
+        effect = self._effects[name]
+        magnitude, pulse, cursor = effect
+        count = min(tick_frames, budget, len(pulse))
+        effect[2] = (cursor + count) % len(pulse)
+
+        frames = self._scaled_frames(pulse, magnitude, cursor, count)
+        now = self.clock.time()
+        self._backlog_until = max(self._backlog_until, now) + count * PULSE_FRAME_DURATION
+        await self.command_queue.put({
+            "type": "pluse",
+            "data": frames,
+            "priority": PRIORITY_STATUS,
+            "ttl": tick_frames * PULSE_FRAME_DURATION
+        })
+
+    def _scaled_frames(self, pulse: tuple, magnitude: int, cursor: int, count: int) -> tuple:
+        """从波形中截取若干帧并按状态强度缩放，结果按分级缓存"""
+        level = max(1, min(INTENSITY_LEVELS, round(magnitude * INTENSITY_LEVELS / MAX_MAGNITUDE)))
+        key = (pulse, level, cursor, count)
+        frames = self._frame_cache.get(key)
+        if frames is None:
+            if len(self._frame_cache) > 512:
+                self._frame_cache.clear()
+            length = len(pulse)
+            frames = tuple(
+                (frequency, tuple(value * level // INTENSITY_LEVELS for value in strength))
+                for frequency, strength in (pulse[(cursor + i) % length] for i in range(count))
+            )
+            self._frame_cache[key] = frames
+        return frames
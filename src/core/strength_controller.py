@@ -0,0 +1,92 @@
+import asyncio
+
+from src.core.clock import SYSTEM_CLOCK
+
+CHANNELS = ("a", "b")
+
+
+class StrengthController:
+    """按固定节拍下发强度的控制器
+
+    受伤只累加各通道的目标增量，节拍任务按配置的速率衰减目标，
+    每个节拍每个通道最多发送一条设置强度指令，指令频率与事件频率无关。
+    第一次变化立即发送，之后的变化合并到下一个节拍。
+    """
+
+    def __init__(self, command_queue, config_manager, dglab_controller=None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.command_queue = command_queue
+        self.config = config_manager
+        self.dglab_controller = dglab_controller
+        self.target = {channel: 0.0 for channel in CHANNELS}  # 在基准强度之上的增量
+        self._base = {channel: 0 for channel in CHANNELS}  # 开始累加时设备的强度
+        self._sent = {channel: None for channel in CHANNELS}
+        self._task = None
+        self._last_tick = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None
+
+    def add(self, amount_a: int, amount_b: int):
+        """把一次受伤的强度增量合并到目标"""
+        if not self.active and not any(self.target.values()):
+            # 从空闲开始累加时记录设备当前强度作为基准
+            self._base["a"] = getattr(self.dglab_controller, "current_strength_A", 0)
+            self._base["b"] = getattr(self.dglab_controller, "current_strength_B", 0)
+        self.target["a"] += amount_a
+        self.target["b"] += amount_b
+        if self._task is None:
+            self._last_tick = self.clock.time()
+            self._task = asyncio.create_task(self._run())
+
+    def clear(self):
+        """清空目标，之后由调用方直接设置或释放强度"""
+        for channel in CHANNELS:
+            self.target[channel] = 0.0
+            self._sent[channel] = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def close(self):
+        self.clear()
+
+    async def _tick(self, cfg) -> bool:
+        """衰减目标并发送有变化的通道，返回是否发送了指令"""
+        now = self.clock.time()
+        elapsed = now - self._last_tick
+        self._last_tick = now
+        limits = self._limits()
+        sent = False
+        for channel in CHANNELS:
+            # 衰减速率为每秒降低通道上限的百分比
+            decay = cfg.strength_decay * limits[channel] / 100 * elapsed
+            target = max(0.0, min(self.target[channel] - decay, limits[channel]))
+            self.target[channel] = target
+            value = min(self._base[channel] + round(target), limits[channel])
+            if value != self._sent[channel]:
+                self._sent[channel] = value
+                sent = True
+                await self.command_queue.put({"type": "strlst", "data": value, "chose": channel})
+        return sent
+
+    def _limits(self):
+        controller = self.dglab_controller
+        return {
+            "a": getattr(controller, "max_strength_A", 0),
+            "b": getattr(controller, "max_strength_B", 0),
+        }
+
+    async def _run(self):
+        """节拍循环：目标衰减到零，或不衰减且一个节拍内没有新变化时退出"""
+        try:
+            while True:
+                cfg = self.config.snapshot
+                sent = await self._tick(cfg)
+                if not any(self.target.values()) or (cfg.strength_decay == 0 and not sent):
+                    break
+                await self.clock.sleep(cfg.strength_tick)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
@@ -0,0 +1,137 @@
+"""参数化波形合成
+
+根据包络、频率扫描、时长和强度系数生成DGLab波形帧（每帧4个频率值和4个强度值，
+共100ms），结果与ConfigManager.compile_pulse的输出格式相同。
+numpy在第一次合成时才导入，不开启波形合成时不影响启动时间。
+合成结果按参数元组存入有界LRU缓存，命中时直接返回同一个元组对象，
+调度器也会据此合并尚未发送的相同波形。
+"""
+from collections import OrderedDict
+
+from src.config.config_manager import PULSE_FREQUENCY_RANGE, PULSE_MAX_LENGTH, PULSE_STRENGTH_RANGE
+
+# 每帧包含的子段数
+SUBFRAMES = 4
+# 强度分级数，受伤、死亡和持续效果波形的强度按级缓存
+INTENSITY_LEVELS = 10
+CACHE_SIZE = 256
+
+ENVELOPES = ("flat", "ramp_up", "ramp_down", "triangle", "decay")
+
+
+def _envelope(shape: str, samples: int):
+    """生成0~1之间的包络"""
+    import numpy as np
+
+    t = np.linspace(0.0, 1.0, samples)
+    if shape == "flat":
+        return np.ones(samples)
+    if shape == "ramp_up":
+        return t
+    if shape == "ramp_down":
+        return 1.0 - t
+    if shape == "triangle":
+        return 1.0 - np.abs(2.0 * t - 1.0)
+    if shape == "decay":
+        return np.exp(-3.0 * t)
+    raise ValueError(f"未知的包络: {shape}")
+
+
+def render(frames: int, envelope: str, freq_start: int, freq_end: int, intensities):
+    """批量合成：同一形状、多个强度系数一次生成
+
+    返回形状为(强度数, 帧数, 2, 4)的整数数组，[..., 0, :]为频率，[..., 1, :]为强度
+    """
+    import numpy as np
+
+    if not 1 <= frames <= PULSE_MAX_LENGTH:
+        raise ValueError(f"波形帧数必须在 1~{PULSE_MAX_LENGTH} 之间")
+    samples = frames * SUBFRAMES
+    intensities = np.clip(np.asarray(intensities, dtype=float).reshape(-1, 1), 0.0, 1.0)
+
+    frequency = np.linspace(freq_start, freq_end, samples)
+    frequency = np.clip(np.rint(frequency), *PULSE_FREQUENCY_RANGE).astype(int)
+    strength = intensities * _envelope(envelope, samples) * PULSE_STRENGTH_RANGE[1]
+    strength = np.clip(np.rint(strength), *PULSE_STRENGTH_RANGE).astype(int)
+
+    result = np.empty((len(intensities), frames, 2, SUBFRAMES), dtype=int)
+    result[:, :, 0, :] = frequency.reshape(frames, SUBFRAMES)
+    result[:, :, 1, :] = strength.reshape(-1, frames, SUBFRAMES)
+    return result
+
+
+def _to_pulse(frames) -> tuple:
+    return tuple((tuple(frequency), tuple(strength)) for frequency, strength in frames.tolist())
+
+
+class WaveformCache:
+    """按参数元组缓存合成结果的有界LRU"""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, frames: int, envelope: str, freq_start: int, freq_end: int, level: int) -> tuple:
+        """取出波形，强度为level/INTENSITY_LEVELS，未缓存时合成"""
+        key = (frames, envelope, freq_start, freq_end, level)
+        pulse = self._entries.get(key)
+        if pulse is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pulse
+        self.misses += 1
+        pulse = _to_pulse(render(frames, envelope, freq_start, freq_end, level / INTENSITY_LEVELS)[0])
+        self._put(key, pulse)
+        return pulse
+
+    def prewarm(self, frames: int, envelope: str, freq_start: int, freq_end: int):
+        """一次合成某个形状的全部强度等级"""
+        levels = range(1, INTENSITY_LEVELS + 1)
+        batch = render(frames, envelope, freq_start, freq_end, [level / INTENSITY_LEVELS for level in levels])
+        for level, rendered in zip(levels, batch):
+            self._put((frames, envelope, freq_start, freq_end, level), _to_pulse(rendered))
+
+    def _put(self, key, pulse):
+        self._entries[key] = pulse
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+CACHE = WaveformCache()
+
+# 受伤：短促的衰减脉冲，频率由低到高扫描
+HIT_FRAMES = 6
+HIT_SHAPE = ("decay", 10, 40)
+# 死亡：持续的三角包络
+DEATH_SHAPE = ("triangle", 10, 10)
+DEATH_MAX_KILLS = 3
+
+
+def _level(ratio: float) -> int:
+    return max(1, min(INTENSITY_LEVELS, round(ratio * INTENSITY_LEVELS)))
+
+
+def hit_pulse(health_loss: int) -> tuple:
+    """受伤波形：强度随损失血量增大，损失50点及以上为最大强度"""
+    envelope, freq_start, freq_end = HIT_SHAPE
+    return CACHE.get(HIT_FRAMES, envelope, freq_start, freq_end, _level(health_loss / 50))
+
+
+def death_pulse(round_kills: int) -> tuple:
+    """死亡波形：本回合击杀越少，持续越久"""
+    frames = 10 - 2 * min(max(round_kills, 0), DEATH_MAX_KILLS)
+    envelope, freq_start, freq_end = DEATH_SHAPE
+    return CACHE.get(frames, envelope, freq_start, freq_end, INTENSITY_LEVELS)
+
+
+def prewarm():
+    """预先合成全部受伤/死亡波形，比赛中只会命中缓存"""
+    CACHE.prewarm(HIT_FRAMES, *HIT_SHAPE)
+    for kills in range(DEATH_MAX_KILLS + 1):
+        death_pulse(kills)
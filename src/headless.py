@@ -0,0 +1,49 @@
+"""无界面模式：只运行GSI监听、DGLab服务器和HTTP/WS接口
+
+不导入pywebview，适合在游戏电脑旁常驻的Linux主机上运行。
+绑定二维码以文本形式输出到终端，控制界面可以在浏览器中打开。
+
+用法::
+
+    python -m src.headless [--no-qrcode]
+"""
+import argparse
+import asyncio
+
+from src.api.main import config, state, startup
+from src.api.server import ServerRunner
+from src.utils.qrcode import render_qrcode_text
+
+
+async def print_device_qrcodes():
+    """后台服务启动完成后在终端输出每台设备的绑定二维码"""
+    await startup.done.wait()
+    for index, url in enumerate(state.qrcode_urls):
+        print(f"设备{index + 1} 绑定二维码（使用DGLab App扫描）:")
+        print(render_qrcode_text(url))
+
+
+async def run_headless(show_qrcode: bool = True):
+    runner = ServerRunner()
+    server_config = config.server
+    print(f"控制界面: http://{server_config['api_host']}:{server_config['api_port']}/static/index.html")
+    if show_qrcode:
+        asyncio.create_task(print_device_qrcodes())
+    # 在主线程中运行，Ctrl+C由uvicorn处理并正常关闭服务
+    await runner.serve()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以无界面模式运行CS2&DGLab")
+    parser.add_argument("--no-qrcode", action="store_true", help="不在终端输出绑定二维码")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(run_headless(not args.no_qrcode))
+    except KeyboardInterrupt:
+        pass
+    config.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""端到端延迟基准测试
+
+启动GameStateListener和DGLabController，用本地模拟的DG-Lab App完成绑定，
+以递增速率发送会触发受伤波形的GSI数据，统计每种模式下：
+
+- POST→入队：发出HTTP请求到波形指令进入调度器
+- 入队→执行：指令进入调度器到 ``_execute_command`` 开始执行
+- 执行→送达：开始执行到模拟App从5678端口的WebSocket收到波形
+
+结果以JSON报告输出，便于在不同版本之间比较。
+
+用法::
+
+    python -m src.tools.bench_latency --rates 10,50,100 --count 200 -o bench.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import platform
+import socket
+import sys
+import time
+from collections import deque
+
+import aiohttp
+import websockets
+
+from src.config.config_manager import ConfigManager
+from src.core.dglab_controller import DGLabController
+from src.core.game_listener import GameStateListener
+
+BENCH_STEAMID = "76561190000000000"
+MODES = ("normal", "fixed", "challenge")
+DEFAULT_RATES = (10, 50, 100, 200)
+DEFAULT_COUNT = 200
+# 每轮结束后等待剩余指令送达的时间（秒）
+DRAIN_SECONDS = 1.0
+PERCENTILES = (50, 95, 99)
+
+# 当前请求的序号，用于把入队的指令对应回发出的请求
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def summarize(samples: list) -> dict:
+    """计算延迟分位数（毫秒）"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    result = {"count": len(ordered), "mean": sum(ordered) / len(ordered) * 1000}
+    for p in PERCENTILES:
+        index = min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))
+        result[f"p{p}"] = ordered[index] * 1000
+    return result
+
+
+def hit_payload(request_id: int, health: int, previous: int, token: str = "") -> dict:
+    """构造一条本地玩家血量从previous变为health的GSI数据，bench字段携带请求序号"""
+    return {
+        "bench": request_id,
+        "auth": {"token": token},
+        "provider": {"steamid": BENCH_STEAMID},
+        "map": {"phase": "live"},
+        "round": {"phase": "live"},
+        "player": {
+            "steamid": BENCH_STEAMID,
+            "state": {"health": health, "flashed": 0, "smoked": 0, "burning": 0, "round_kills": 0},
+        },
+        "previously": {"player": {"state": {"health": previous}}},
+    }
+
+
+class FakeApp:
+    """模拟DG-Lab App：连接5678端口、完成绑定并记录收到的波形"""
+
+    def __init__(self, uri: str, client_id: str):
+        self.uri = uri
+        self.client_id = client_id
+        self.on_pulse = None
+        self._websocket = None
+        self._task = None
+
+    async def connect(self):
+        self._websocket = await websockets.connect(self.uri)
+        hello = json.loads(await self._websocket.recv())
+        app_id = hello["clientId"]
+        await self._websocket.send(json.dumps({
+            "type": "bind", "clientId": self.client_id, "targetId": app_id, "message": "DGLAB"
+        }))
+        # 上报强度上限，使强度指令有实际数值
+        await self._websocket.send(json.dumps({
+            "type": "msg", "clientId": self.client_id, "targetId": app_id, "message": "strength-0+0+100+100"
+        }))
+        self._task = asyncio.create_task(self._receive())
+
+    async def _receive(self):
+        async for raw in self._websocket:
+            now = time.perf_counter()
+            message = json.loads(raw).get("message", "")
+            if isinstance(message, str) and message.startswith("pulse-A:") and self.on_pulse:
+                self.on_pulse(now)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._websocket:
+            await self._websocket.close()
+
+
+class LatencyProbe:
+    """在调度器入队和指令执行处打点，按请求关联三段延迟"""
+
+    def __init__(self, controller: DGLabController):
+        self.sent_at = {}
+        self.enqueued = {}
+        self.executed = deque()
+        self.post_to_queue = []
+        self.queue_to_exec = []
+        self.exec_to_wire = []
+
+        scheduler = controller.queue
+        original_put = scheduler.put_nowait
+        original_execute = controller._execute_command
+
+        def put_nowait(cmd):
+            request_id = current_request.get()
+            if cmd["type"] == "pluse" and request_id is not None:
+                now = time.perf_counter()
+                self.enqueued[id(cmd)] = now
+                self.post_to_queue.append(now - self.sent_at[request_id])
+            original_put(cmd)
+
+        async def execute_command(cmd):
+            enqueued_at = self.enqueued.pop(id(cmd), None)
+            if enqueued_at is not None:
+                now = time.perf_counter()
+                self.queue_to_exec.append(now - enqueued_at)
+                self.executed.append(now)
+            await original_execute(cmd)
+
+        scheduler.put_nowait = put_nowait
+        controller._execute_command = execute_command
+
+    def attach(self, listener: GameStateListener):
+        """处理请求时设置请求序号，使入队打点能关联到对应请求"""
+        original_process = listener.process_payload
+
+        async def process_payload(data):
+            token = current_request.set(data.get("bench") if data else None)
+            try:
+                return await original_process(data)
+            finally:
+                current_request.reset(token)
+
+        listener.process_payload = process_payload
+
+    def on_pulse(self, received_at: float):
+        if self.executed:
+            self.exec_to_wire.append(received_at - self.executed.popleft())
+
+    def reset(self):
+        self.sent_at.clear()
+        self.enqueued.clear()
+        self.executed.clear()
+        self.post_to_queue = []
+        self.queue_to_exec = []
+        self.exec_to_wire = []
+
+
+async def run_round(session, gsi_url: str, probe: LatencyProbe, rate: float, count: int, token: str = "") -> dict:
+    """以固定速率发送count条受伤数据"""
+    probe.reset()
+    interval = 1 / rate
+    health = 100
+    requests = []
+    errors = 0
+    start = time.perf_counter()
+
+    async def post(request_id: int, payload: dict):
+        nonlocal errors
+        probe.sent_at[request_id] = time.perf_counter()
+        async with session.post(gsi_url, json=payload) as response:
+            if response.status != 200:
+                errors += 1
+            await response.read()
+
+    for request_id in range(count):
+        # 血量逐次减1，降到1后回满（回满的那条不触发受伤）
+        previous = health
+        health = health - 1 if health > 1 else 100
+        requests.append(asyncio.create_task(post(request_id, hit_payload(request_id, health, previous, token))))
+        delay = start + (request_id + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await asyncio.gather(*requests)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(DRAIN_SECONDS)
+
+    return {
+        "rate": rate,
+        "sent": count,
+        "errors": errors,
+        "achieved_rate": count / elapsed,
+        "post_to_queue_ms": summarize(probe.post_to_queue),
+        "queue_to_exec_ms": summarize(probe.queue_to_exec),
+        "exec_to_wire_ms": summarize(probe.exec_to_wire),
+    }
+
+
+async def run_benchmark(config_path: str, rates, count: int, modes) -> dict:
+    config = ConfigManager(config_path, persist=False)
+    config.update("gsi_record_path", "")
+
+    dglab_port = free_port()
+    controller = DGLabController(f"ws://127.0.0.1:{dglab_port}", "127.0.0.1", dglab_port)
+    controller_task = asyncio.create_task(controller.start())
+    while controller.client is None:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    probe = LatencyProbe(controller)
+    app = FakeApp(f"ws://127.0.0.1:{dglab_port}", str(controller.client.client_id))
+    app.on_pulse = probe.on_pulse
+    await app.connect()
+    while not controller.is_connected or controller.max_strength_A == 0:
+        await asyncio.sleep(0.01)
+
+    results = []
+    async with aiohttp.ClientSession() as session:
+        for mode in modes:
+            config.update("mode", mode)
+            gsi_port = free_port()
+            listener = GameStateListener(config, controller.queue, controller)
+            await listener.start("127.0.0.1", gsi_port)
+            probe.attach(listener)
+            for rate in rates:
+                result = await run_round(session, f"http://127.0.0.1:{gsi_port}", probe, rate, count,
+                                         config.snapshot.gsi_token)
+                result["mode"] = mode
+                results.append(result)
+                print(
+                    f"[{mode}] {rate}/s: POST→入队 p50={result['post_to_queue_ms'].get('p50', 0):.2f}ms "
+                    f"入队→执行 p50={result['queue_to_exec_ms'].get('p50', 0):.2f}ms "
+                    f"执行→送达 p50={result['exec_to_wire_ms'].get('p50', 0):.2f}ms",
+                    file=sys.stderr
+                )
+            await listener.stop()
+
+    await app.close()
+    controller_task.cancel()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "count": count,
+        "scheduler": dict(controller.queue.stats),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GSI到DGLab的端到端延迟基准测试")
+    parser.add_argument("--rates", default=",".join(str(rate) for rate in DEFAULT_RATES), help="发送速率列表（条/秒）")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="每个速率发送的数据条数")
+    parser.add_argument("--modes", default=",".join(MODES), help="测试的模式列表")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument("-o", "--output", help="JSON报告输出文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    modes = [mode for mode in args.modes.split(",") if mode in MODES]
+    report = asyncio.run(run_benchmark(args.config, rates, args.count, modes))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""GSI订阅方案延迟报告
+
+用记录的会话估算每种订阅方案的端到端延迟：把日志中带增量块的数据视为游戏内
+状态变化的时间，按方案的buffer/throttle模拟CS2的发送时机，得到变化到发送的等待；
+再回放一次日志测出监听器处理每条数据的耗时，两者相加即为该方案的有效延迟。
+
+日志本身是在某个方案下记录的，时间戳已经包含了记录时的发送节奏，
+因此结果用于比较方案之间的差异，绝对值是下限。处理耗时只计监听器处理数据本身，
+与方案无关，各方案加上的是同一个值。
+
+用法::
+
+    python -m src.tools.gsi_profile_report session.gsi.gz [更多日志...] -o report.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from src.config.config_manager import ConfigManager
+from src.tools.bench_latency import summarize
+from src.tools.replay import replay
+from src.utils.gsi_profiles import GSI_PROFILES
+from src.utils.gsi_recorder import read_gsi_log
+
+
+def change_times(log_path: str) -> list:
+    """日志中带previously/added增量块（即状态发生变化）的数据时间"""
+    times = []
+    for timestamp, body in read_gsi_log(log_path):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and (data.get("previously") or data.get("added")):
+            times.append(timestamp)
+    return times
+
+
+def simulate_delivery(times: list, profile: dict):
+    """按buffer/throttle模拟发送：变化后等待buffer合并，两次发送间隔不小于throttle
+
+    返回每次变化的等待时间和实际发送次数
+    """
+    buffer = profile["buffer"]
+    throttle = profile["throttle"]
+    delays = []
+    sends = 0
+    last_send = float("-inf")
+    scheduled = None  # 已安排但尚未发送的时间
+    for t in times:
+        if scheduled is None or t > scheduled:
+            scheduled = max(t + buffer, last_send + throttle)
+            last_send = scheduled
+            sends += 1
+        delays.append(scheduled - t)
+    return delays, sends
+
+
+async def processing_cost(log_path: str, config: ConfigManager) -> float:
+    """回放日志，返回监听器处理每条数据的平均耗时（秒），只计process_payload本身"""
+    result = await replay(log_path, config)
+    processing = result["processing_seconds"]
+    return sum(processing) / len(processing) if processing else 0.0
+
+
+def build_report(log_paths, config: ConfigManager) -> dict:
+    sessions = []
+    for log_path in log_paths:
+        times = change_times(log_path)
+        cost = asyncio.run(processing_cost(log_path, config))
+        profiles = {}
+        for name, profile in GSI_PROFILES.items():
+            delays, sends = simulate_delivery(times, profile)
+            profiles[name] = {
+                "buffer": profile["buffer"],
+                "throttle": profile["throttle"],
+                "changes": len(times),
+                "sends": sends,
+                "delivery_ms": summarize(delays),
+                "processing_ms": cost * 1000,
+                "end_to_end_ms": summarize([delay + cost for delay in delays]),
+            }
+        sessions.append({"log": log_path, "profiles": profiles})
+    return {"sessions": sessions}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="估算各GSI订阅方案在记录会话上的端到端延迟")
+    parser.add_argument("logs", nargs="+", help="GsiRecorder记录的日志文件")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument("-o", "--output", help="JSON报告输出文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    config = ConfigManager(args.config, persist=False)
+    config.update("gsi_record_path", "")
+    report = build_report(args.logs, config)
+
+    for session in report["sessions"]:
+        print(session["log"], file=sys.stderr)
+        for name, result in session["profiles"].items():
+            latency = result["end_to_end_ms"]
+            print(
+                f"  {name:<12} 发送 {result['sends']}/{result['changes']} 次  "
+                f"端到端 p50={latency.get('p50', 0):.1f}ms p95={latency.get('p95', 0):.1f}ms "
+                f"p99={latency.get('p99', 0):.1f}ms",
+                file=sys.stderr
+            )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
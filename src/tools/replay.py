@@ -0,0 +1,168 @@
+"""GSI会话回放工具
+
+把GsiRecorder记录的日志按原速、N倍速或尽快回放给GameStateListener，
+输出本应发送给DGLabController的指令流，用于模式逻辑回归检查和吞吐量测量。
+
+用法::
+
+    python -m src.tools.replay session.gsi.gz --speed max --mode challenge -o commands.jsonl
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import sys
+import time
+
+from src.config.config_manager import PULSE_FRAME_DURATION, ConfigManager
+from src.core.command_scheduler import CommandScheduler
+from src.core.game_listener import GameStateListener
+from src.utils.gsi_recorder import read_gsi_log
+
+# 每次推进虚拟时钟后让出事件循环的次数，保证回调链执行完毕
+SETTLE_ROUNDS = 10
+# 回放结束后继续推进的虚拟时间（秒），让死亡后的延时效果执行完
+TAIL_SECONDS = 10.0
+# 回放时使用的设备强度上限
+DEFAULT_MAX_STRENGTH = 100
+
+
+async def settle():
+    for _ in range(SETTLE_ROUNDS):
+        await asyncio.sleep(0)
+
+
+class VirtualClock:
+    """虚拟时钟：时间只在回放驱动推进时前进，sleep在推进到期时返回"""
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleepers = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + delay, next(self._seq), future))
+        await future
+
+    async def advance_to(self, target: float):
+        """推进到目标时间，按顺序唤醒期间到期的sleep"""
+        while self._sleepers and self._sleepers[0][0] <= target:
+            wake_time, _, future = heapq.heappop(self._sleepers)
+            self.now = max(self.now, wake_time)
+            if not future.done():
+                future.set_result(None)
+                await settle()
+        self.now = max(self.now, target)
+        await settle()
+
+
+class ReplayController:
+    """代替DGLabController接收指令，并记录指令发出的虚拟时间"""
+
+    def __init__(self, clock: VirtualClock, max_strength: int = DEFAULT_MAX_STRENGTH):
+        self.clock = clock
+        self.max_strength_A = max_strength
+        self.max_strength_B = max_strength
+        self.commands = []
+        self._pulse_until = 0.0
+
+    def pulse_backlog_frames(self) -> float:
+        return max(0.0, self._pulse_until - self.clock.time()) / PULSE_FRAME_DURATION
+
+    async def drain(self, queue):
+        while True:
+            cmd = await queue.get()
+            if cmd["type"] == "pluse":
+                self._pulse_until = max(self._pulse_until, self.clock.time()) + len(cmd["data"]) * PULSE_FRAME_DURATION
+            self.commands.append((self.clock.time(), cmd))
+
+
+async def replay(log_path: str, config: ConfigManager, speed: float = None,
+                 max_strength: int = DEFAULT_MAX_STRENGTH) -> dict:
+    """回放日志，speed为None时尽快回放，返回指令流和统计信息"""
+    clock = VirtualClock()
+    scheduler = CommandScheduler(clock=clock)
+    controller = ReplayController(clock, max_strength)
+    listener = GameStateListener(config, scheduler, controller, clock)
+    drain_task = asyncio.create_task(controller.drain(scheduler))
+
+    payloads = rejected = 0
+    processing = []  # 每条数据在监听器中的处理耗时，不含回放自身的调度开销
+    start = time.perf_counter()
+    for timestamp, body in read_gsi_log(log_path):
+        if speed is not None and timestamp > clock.now:
+            await asyncio.sleep((timestamp - clock.now) / speed)
+        await clock.advance_to(timestamp)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        started = time.perf_counter()
+        error = await listener.process_payload(data) if data is not None else "数据格式错误"
+        processing.append(time.perf_counter() - started)
+        if error:
+            rejected += 1
+        payloads += 1
+        await settle()
+    await clock.advance_to(clock.now + TAIL_SECONDS)
+    elapsed = time.perf_counter() - start
+
+    drain_task.cancel()
+    await listener.stop()
+    return {
+        "commands": controller.commands,
+        "payloads": payloads,
+        "rejected": rejected,
+        "session_seconds": clock.now - TAIL_SECONDS,
+        "elapsed_seconds": elapsed,
+        "processing_seconds": processing,
+        "scheduler": dict(scheduler.stats),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="回放GSI会话并输出DGLab指令流")
+    parser.add_argument("log", help="GsiRecorder记录的日志文件")
+    parser.add_argument("--speed", default="max", help="回放速度：1为原速，N为N倍速，max为尽快回放")
+    parser.add_argument("--mode", choices=("normal", "fixed", "challenge"), help="覆盖配置中的模式")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument("--max-strength", type=int, default=DEFAULT_MAX_STRENGTH, help="模拟的设备强度上限")
+    parser.add_argument("-o", "--output", help="指令流输出文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    speed = None if args.speed == "max" else float(args.speed)
+    config = ConfigManager(args.config, persist=False)
+    config.update("gsi_record_path", "")
+    if args.mode:
+        config.update("mode", args.mode)
+
+    result = asyncio.run(replay(args.log, config, speed, args.max_strength))
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for timestamp, cmd in result["commands"]:
+            output.write(json.dumps({"t": round(timestamp, 3), "cmd": cmd}, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = result["elapsed_seconds"]
+    print(
+        f"回放完成: {result['payloads']} 条数据（拒绝 {result['rejected']} 条），"
+        f"{len(result['commands'])} 条指令，会话时长 {result['session_seconds']:.1f}s，"
+        f"耗时 {elapsed:.3f}s（{result['payloads'] / elapsed if elapsed else 0:.0f} 条/秒）",
+        file=sys.stderr
+    )
+    print(f"调度统计: {result['scheduler']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,170 @@
-import winreg
+import hashlib
+import json
+import os
+import sys
 from pathlib import Path
+from src.utils import vdf
+from src.utils.gsi_profiles import DEFAULT_PROFILE, get_profile, render_gamestate_cfg
 
-def find_cs2_install_path() -> str:
-    """查找CS2安装路径"""
+CS2_APP_ID = "730"
+CS2_INSTALL_DIR = "Counter-Strike Global Offensive"
+CFG_FILENAME = "gamestate_integration_nodecs2.cfg"
+# 查找结果缓存，libraryfolders.vdf和cfg文件的修改时间不变时跳过扫描
+CACHE_PATH = "cs2_path_cache.json"
+
+def _mtime(path) -> int:
+    """文件修改时间（纳秒），文件不存在时返回None"""
     try:
-        # 从注册表获取Steam安装路径
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, 'Software\Valve\Steam', 0, winreg.KEY_READ) as key:
-            steam_path, _ = winreg.QueryValueEx(key, 'SteamPath')
-            steam_path = Path(steam_path)
-    except Exception as e:
-        raise RuntimeError(f"获取Steam路径失败: {e}")
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
-    # 读取库文件夹配置
-    lib_path = steam_path / 'steamapps' / 'libraryfolders.vdf'
-    if not lib_path.exists():
-        raise FileNotFoundError("Steam库配置文件不存在")
+def _load_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
 
-    last_path = None
-    found = False
-    with open(lib_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip('\n').strip('\t')
-            if line.startswith('"path"'):
-                _, path_val = line.split('\t\t')
-                last_path = Path(path_val.strip('"').encode().decode('unicode_escape'))
-            elif '"730"' in line:  # 730是CS2的AppID
-                found = True
-                break
+def _save_cache(cache: dict, cache_path: str):
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=4)
+    except OSError as e:
+        print(f"保存CS2路径缓存失败: {e}")
 
-    if not found or not last_path:
-        raise FileNotFoundError("未找到CS2安装路径")
+def _windows_steam_roots() -> list:
+    import winreg
 
-    # 验证CS2路径
-    cs2_paths = [
-        last_path / 'steamapps' / 'common' / 'Counter-Strike Global Offensive',
-        last_path / 'game' / 'csgo'
+    roots = []
+    keys = [
+        (winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam", "SteamPath"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Valve\Steam", "InstallPath"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Valve\Steam", "InstallPath"),
     ]
-    for path in cs2_paths:
-        if path.exists():
-            return str(path)
-    
-    raise FileNotFoundError("CS2安装路径验证失败")
+    for hive, subkey, name in keys:
+        try:
+            with winreg.OpenKey(hive, subkey, 0, winreg.KEY_READ) as key:
+                roots.append(Path(winreg.QueryValueEx(key, name)[0]))
+        except OSError:
+            continue
+    program_files = os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)")
+    roots.append(Path(program_files) / "Steam")
+    return roots
+
+def find_steam_roots() -> list:
+    """按优先级返回本机存在的Steam安装目录
+
+    Windows从注册表读取，Linux检查原生、Flatpak和Snap版的默认位置
+    """
+    if sys.platform == "win32":
+        candidates = _windows_steam_roots()
+    else:
+        home = Path.home()
+        candidates = [
+            home / ".steam" / "steam",
+            home / ".steam" / "root",
+            home / ".local" / "share" / "Steam",
+            home / ".var" / "app" / "com.valvesoftware.Steam" / ".local" / "share" / "Steam",
+            home / "snap" / "steam" / "common" / ".local" / "share" / "Steam",
+            home / "Library" / "Application Support" / "Steam",
+        ]
+    roots = []
+    seen = set()
+    for path in candidates:
+        if not (path / "steamapps").is_dir():
+            continue
+        # ~/.steam/steam通常是指向实际目录的符号链接
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            roots.append(resolved)
+    return roots
+
+def library_folders(steam_root: Path) -> list:
+    """读取libraryfolders.vdf，返回(库路径, 是否记录了CS2)列表，记录了CS2的库排在前面"""
+    data = vdf.load(steam_root / "steamapps" / "libraryfolders.vdf")
+    folders = vdf.get(data, "libraryfolders", {})
+    libraries = [(steam_root, False)]
+    for key, value in folders.items():
+        if isinstance(value, dict):
+            # 新格式："0" { "path" "..." "apps" { "730" "..." } }
+            path = vdf.get(value, "path")
+            apps = vdf.get(value, "apps", {})
+            has_cs2 = isinstance(apps, dict) and CS2_APP_ID in apps
+        elif key.isdigit():
+            # 旧格式："1" "D:\\SteamLibrary"
+            path, has_cs2 = value, False
+        else:
+            continue
+        if path:
+            libraries.append((Path(path), has_cs2))
+    libraries.sort(key=lambda item: not item[1])
+    return libraries
+
+def _cs2_dir(library: Path):
+    """在库中查找CS2目录，安装目录名以appmanifest为准"""
+    steamapps = library / "steamapps"
+    install_dir = CS2_INSTALL_DIR
+    manifest = steamapps / f"appmanifest_{CS2_APP_ID}.acf"
+    if manifest.exists():
+        try:
+            install_dir = vdf.get(vdf.get(vdf.load(manifest), "AppState", {}), "installdir", install_dir)
+        except ValueError:
+            pass
+    path = steamapps / "common" / install_dir
+    return path if (path / "game" / "csgo").is_dir() else None
+
+def _scan_cs2_install_path():
+    """扫描所有Steam库，返回(libraryfolders.vdf路径, CS2路径)"""
+    roots = find_steam_roots()
+    if not roots:
+        raise RuntimeError("获取Steam路径失败: 未找到Steam安装目录")
+    for root in roots:
+        lib_path = root / "steamapps" / "libraryfolders.vdf"
+        if not lib_path.exists():
+            continue
+        try:
+            libraries = library_folders(root)
+        except ValueError as e:
+            print(f"解析Steam库配置失败 {lib_path}: {e}")
+            libraries = [(root, False)]
+        for library, _ in libraries:
+            path = _cs2_dir(library)
+            if path:
+                return lib_path, path
+    raise FileNotFoundError("未找到CS2安装路径")
+
+def find_cs2_install_path(cache_path: str = CACHE_PATH) -> str:
+    """查找CS2安装路径，libraryfolders.vdf未修改且目录仍存在时直接使用缓存"""
+    cache = _load_cache(cache_path)
+    cached = cache.get("install")
+    if (isinstance(cached, dict) and cached.get("vdf_mtime") is not None
+            and _mtime(cached.get("vdf", "")) == cached["vdf_mtime"]
+            and Path(cached.get("cs2_path", ""), "game", "csgo").is_dir()):
+        return cached["cs2_path"]
+
+    lib_path, cs2_path = _scan_cs2_install_path()
+    cache["install"] = {"vdf": str(lib_path), "vdf_mtime": _mtime(lib_path), "cs2_path": str(cs2_path)}
+    _save_cache(cache, cache_path)
+    return str(cs2_path)
+
+def setup_cs2_gamestate_cfg(cs2_path: str, uri: str = "http://127.0.0.1:3000", observer: bool = False,
+                            profile: str = DEFAULT_PROFILE, sections=("round", "player_state"),
+                            token: str = "", cache_path: str = CACHE_PATH) -> bool:
+    """配置CS2游戏状态集成文件，内容未变化时不重写
 
-def setup_cs2_gamestate_cfg(cs2_path: str) -> bool:
-    """配置CS2游戏状态集成文件"""
-    cfg_content = """"CS2&DGLAB"
-{
- "uri" "http://127.0.0.1:3000"
- "timeout" "0.1"
- "buffer"  "0.1"
- "throttle" "0.5"
- "heartbeat" "1.0"
- "auth"
- {
-   "token" "MYTOKENHERE"
- }
- "data"
- {
-   "provider"            "1"
-   "map"                 "1"
-   "round"               "1"
-   "player_id"           "1"
-   "player_state"        "1"
- }
-}
-"""
+    observer为True时订阅全体玩家数据，sections为规则用到的数据块，token为监听器校验的令牌。
+    上次写入后文件未被修改且内容相同时，不再读取文件
+    """
+    cfg_content = render_gamestate_cfg(uri, get_profile(profile), sections, observer, token)
+    digest = hashlib.sha1(cfg_content.encode("utf-8")).hexdigest()
+    cache = _load_cache(cache_path)
+    cached = cache.get("cfg")
+    if (isinstance(cached, dict) and cached.get("cs2_path") == str(cs2_path) and cached.get("hash") == digest
+            and cached.get("mtime") is not None and _mtime(cached.get("file", "")) == cached["mtime"]):
+        return True
     try:
         # 可能的CFG路径
         cfg_paths = [
@@ -73,11 +173,15 @@ def setup_cs2_gamestate_cfg(cs2_path: str) -> bool:
         ]
         for cfg_dir in cfg_paths:
             if cfg_dir.exists():
-                cfg_file = cfg_dir / 'gamestate_integration_nodecs2.cfg'
-                with open(cfg_file, 'w', encoding='utf-8') as f:
-                    f.write(cfg_content)
+                cfg_file = cfg_dir / CFG_FILENAME
+                if not (cfg_file.exists() and cfg_file.read_text(encoding='utf-8') == cfg_content):
+                    with open(cfg_file, 'w', encoding='utf-8') as f:
+                        f.write(cfg_content)
+                    print(f"已更新游戏状态配置: {cfg_file}")
+                cache["cfg"] = {"cs2_path": str(cs2_path), "file": str(cfg_file),
+                                "mtime": _mtime(cfg_file), "hash": digest}
+                _save_cache(cache, cache_path)
                 return True
         return False
     except Exception as e:
         raise RuntimeError(f"配置CS2 CFG文件失败: {e}")
-    
\ No newline at end of file
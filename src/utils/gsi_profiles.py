@@ -0,0 +1,73 @@
+"""CS2游戏状态集成（GSI）订阅方案
+
+方案决定CS2发送数据的节奏（buffer/throttle）和额外订阅的数据块，
+基础数据块由规则实际用到的字段决定，没有规则使用的数据块不订阅。
+"""
+from src.utils import vdf
+
+DEFAULT_PROFILE = "default"
+
+# timeout/buffer/throttle/heartbeat单位为秒
+GSI_PROFILES = {
+    # 原有的配置
+    "default": {
+        "timeout": 0.1,
+        "buffer": 0.1,
+        "throttle": 0.5,
+        "heartbeat": 1.0,
+        "sections": (),
+    },
+    # 不合并变化、缩短两次发送的最小间隔，受伤到波形的延迟最低
+    "low-latency": {
+        "timeout": 0.1,
+        "buffer": 0.0,
+        "throttle": 0.1,
+        "heartbeat": 1.0,
+        "sections": (),
+    },
+    # 额外订阅炸弹、武器和比赛统计，供扩展规则使用
+    "rich": {
+        "timeout": 0.1,
+        "buffer": 0.1,
+        "throttle": 0.5,
+        "heartbeat": 1.0,
+        "sections": ("bomb", "player_weapons", "player_match_stats"),
+    },
+}
+
+# 路由和校验始终需要的数据块
+BASE_SECTIONS = ("provider", "map", "player_id")
+
+# 观察者模式额外订阅的全体玩家数据
+OBSERVER_SECTIONS = ("allplayers_id", "allplayers_state", "allplayers_match_stats")
+
+
+def get_profile(name: str) -> dict:
+    """按名称取出订阅方案，未知名称使用默认方案"""
+    profile = GSI_PROFILES.get(name)
+    if profile is None:
+        print(f"未知的GSI订阅方案 {name}，使用默认方案")
+        profile = GSI_PROFILES[DEFAULT_PROFILE]
+    return profile
+
+
+def render_gamestate_cfg(uri: str, profile: dict, sections, observer: bool = False, token: str = "") -> str:
+    """生成gamestate_integration配置文件内容，token为空时不写入auth块"""
+    data = list(BASE_SECTIONS)
+    for section in (*sections, *profile["sections"], *(OBSERVER_SECTIONS if observer else ())):
+        if section not in data:
+            data.append(section)
+    data_lines = "".join(f'   "{section}" "1"\n' for section in data)
+    auth = f' "auth"\n {{\n   "token" {vdf.quote(token)}\n }}\n' if token else ""
+    return f""""CS2&DGLAB"
+{{
+ "uri" {vdf.quote(uri)}
+ "timeout" "{profile['timeout']}"
+ "buffer"  "{profile['buffer']}"
+ "throttle" "{profile['throttle']}"
+ "heartbeat" "{profile['heartbeat']}"
+{auth} "data"
+ {{
+{data_lines} }}
+}}
+"""
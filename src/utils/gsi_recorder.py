@@ -0,0 +1,79 @@
+import gzip
+import json
+import time
+
+# 距离上次刷新超过该时间（秒）才刷新到磁盘，减少gzip同步块
+FLUSH_INTERVAL = 1.0
+# 会话头标记，后面是该会话开始时的Unix时间
+SESSION_HEADER = "#session"
+# 回放时两次会话之间最多保留的间隔（秒），避免按原速回放时长时间等待
+MAX_SESSION_GAP = 60.0
+
+
+class GsiRecorder:
+    """把原始GSI数据按时间戳追加写入gzip压缩日志
+
+    每行格式为 ``相对时间(秒)\\t原始JSON``，JSON字符串中不会出现换行，
+    去掉CS2格式化输出的换行即可保证一行一条。每次打开时先写一行
+    ``#session\\tUnix时间``，相对时间从该会话开始计算。auth块不写入日志
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._start = time.monotonic()
+        self._last_flush = self._start
+        self._file.write(f"{SESSION_HEADER}\t{time.time():.3f}\n")
+        self.count = 0
+
+    def record(self, body: str, data=None):
+        """记录一条原始数据，data为解析结果，其中含有auth块时去掉令牌后重新序列化"""
+        now = time.monotonic()
+        if isinstance(data, dict) and "auth" in data:
+            compact = json.dumps({key: value for key, value in data.items() if key != "auth"},
+                                 ensure_ascii=False, separators=(",", ":"))
+        else:
+            compact = body.replace("\r", "").replace("\n", "")
+        self._file.write(f"{now - self._start:.3f}\t{compact}\n")
+        self.count += 1
+        if now - self._last_flush >= FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        self._file.close()
+
+
+def read_gsi_log(path: str):
+    """逐条读取GSI日志，生成 (相对时间, 原始JSON) 元组
+
+    同一文件中追加的多次会话依次接在前一次之后，时间保持递增；
+    会话之间的间隔按会话头计算，最多保留MAX_SESSION_GAP秒。
+    没有会话头的旧日志在相对时间回退时视为新会话
+    """
+    offset = 0.0  # 当前会话的相对时间在回放时间轴上的起点
+    last = 0.0  # 上一条数据的回放时间
+    session_epoch = None  # 当前会话开始时的Unix时间
+    session_last = 0.0  # 当前会话中上一条数据的相对时间
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            timestamp, body = line.split("\t", 1)
+            if timestamp == SESSION_HEADER:
+                epoch = float(body)
+                gap = 0.0
+                if session_epoch is not None:
+                    gap = min(max(epoch - session_epoch - session_last, 0.0), MAX_SESSION_GAP)
+                session_epoch = epoch
+                session_last = 0.0
+                offset = last + gap
+                continue
+            relative = float(timestamp)
+            if relative < session_last:
+                # 没有会话头的旧日志，时间回退说明是新会话，接在上一条之后
+                offset = last
+            session_last = relative
+            last = offset + relative
+            yield last, body
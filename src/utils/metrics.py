@@ -0,0 +1,183 @@
+"""轻量的Prometheus文本格式指标
+
+指标在模块加载时创建并注册到REGISTRY。直方图的桶在创建时预分配，
+带标签的指标应在模块加载时用labels()取出子项，记录时只做数值累加，
+不产生新对象，比赛中可以一直开启。
+"""
+from bisect import bisect_left
+
+# 默认的耗时桶（秒），覆盖亚毫秒到数秒
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """指标注册表，按注册顺序输出"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def unregister(self, metric):
+        self._metrics.pop(metric.name, None)
+
+    def render(self) -> str:
+        """输出Prometheus文本格式（0.0.4）"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            metric.render(lines)
+        lines.append("")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """指标基类：无标签时自身只有一个子项，有标签时按标签值缓存子项"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._default = None if self.labelnames else self.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """取出标签值对应的子项，不存在时创建"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+
+    def render(self, lines: list):
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{self._label_text(values)} {_format_value(child.value)}")
+
+
+class Gauge(_Metric):
+    """瞬时值；提供getter时在输出时读取，适合队列长度等已有的状态"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, getter=None, labelnames=(), registry: Registry = REGISTRY):
+        self.getter = getter
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default.value = value
+
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+
+    def render(self, lines: list):
+        if self.getter is not None:
+            try:
+                lines.append(f"{self.name} {_format_value(self.getter())}")
+            except Exception as e:
+                print(f"读取指标 {self.name} 出错: {e}")
+            return
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{self._label_text(values)} {_format_value(child.value)}")
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个为+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """分桶直方图，桶边界在创建时固定"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def render(self, lines: list):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {child.count}")
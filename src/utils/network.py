@@ -1,18 +1,26 @@
 import socket
-import psutil
 
-def get_local_ip() -> str:
+# 监听所有地址的写法，本机连接时需要换成回环地址
+WILDCARD_HOSTS = ("0.0.0.0", "", "::")
+
+def loopback_host(host: str) -> str:
+    """服务的本机访问地址，监听所有地址时使用127.0.0.1"""
+    return "127.0.0.1" if host in WILDCARD_HOSTS else host
+
+def get_local_ip(port: int = 5678) -> str:
     """获取本机IP地址（WebSocket格式）"""
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
             s.connect(("8.8.8.8", 80))
             ip = s.getsockname()[0]
-        return f"ws://{ip}:5678"
+        return f"ws://{ip}:{port}"
     except Exception as e:
         raise RuntimeError(f"获取IP地址失败: {e}")
 
 def get_network_interfaces() -> list:
     """获取所有网络接口地址"""
+    import psutil
+
     interfaces = []
     addresses = psutil.net_if_addrs()
     
@@ -26,14 +34,16 @@ def get_network_interfaces() -> list:
     
     return interfaces
 
-def get_local_ip_by_interface(interface_name: str) -> str:
+def get_local_ip_by_interface(interface_name: str, port: int = 5678) -> str:
     """根据指定网络接口获取IP地址"""
+    import psutil
+
     addresses = psutil.net_if_addrs()
     
     if interface_name in addresses:
         for address in addresses[interface_name]:
             if address.family == socket.AF_INET :
-                return f"ws://{address.address}:5678"
+                return f"ws://{address.address}:{port}"
     
     # 如果找不到指定接口，回退到默认方法
-    return get_local_ip()
\ No newline at end of file
+    return get_local_ip(port)
\ No newline at end of file
@@ -1,26 +1,32 @@
-import qrcode
-from PIL import Image
-from pathlib import Path
-import os
-import sys
-
-def get_resource_path(relative_path):
-    """获取资源文件的绝对路径"""
-    if hasattr(sys, '_MEIPASS'):
-        # PyInstaller打包后的路径
-        return os.path.join(sys._MEIPASS, relative_path)
-    # 开发环境路径
-    return os.path.join(os.path.abspath("."), relative_path)
-
-def generate_qrcode(data: str, save_path: str = None) -> str:
-    """生成二维码并保存图片"""
-    # 如果没有指定保存路径，使用默认路径
-    if save_path is None:
-        frontend_dir = get_resource_path("src/frontend")
-        if not os.path.exists(frontend_dir):
-            os.makedirs(frontend_dir)
-        save_path = os.path.join(frontend_dir, "temp_qrcode.png")
-    
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+# 支持的图片格式 -> 媒体类型
+QRCODE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+CACHE_SIZE = 16
+
+
+class QRCodeImage:
+    """渲染好的二维码图片"""
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def render_qrcode(data: str, fmt: str = "png") -> bytes:
+    """在内存中渲染二维码，返回图片内容"""
+    import qrcode
+
+    if fmt not in QRCODE_FORMATS:
+        raise ValueError(f"不支持的二维码格式: {fmt}")
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -29,8 +35,62 @@ def generate_qrcode(data: str, save_path: str = None) -> str:
     )
     qr.add_data(data)
     qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img_path = Path(save_path)
-    img.save(img_path)
-    return str(img_path)
\ No newline at end of file
+
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        import qrcode.image.svg
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_qrcode_text(data: str) -> str:
+    """把二维码渲染成终端文本，用于无界面模式"""
+    import qrcode
+
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.StringIO()
+    # 反色输出，深色背景的终端也能扫描
+    qr.print_ascii(out=buffer, invert=True)
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """按(内容, 格式)缓存二维码的有界LRU，内容不变时不会重新渲染
+
+    启动阶段在线程中预先渲染，因此读写都加锁
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def peek(self, data: str, fmt: str = "png"):
+        """只查缓存，未渲染过时返回None"""
+        key = (data, fmt)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def get(self, data: str, fmt: str = "png") -> QRCodeImage:
+        """取出二维码，未缓存时渲染"""
+        image = self.peek(data, fmt)
+        if image is not None:
+            return image
+        image = QRCodeImage(render_qrcode(data, fmt), QRCODE_FORMATS[fmt])
+        with self._lock:
+            self.renders += 1
+            self._entries[(data, fmt)] = image
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return image
+
+
+QRCODE_CACHE = QRCodeCache()
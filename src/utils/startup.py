@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+
+class StartupTimer:
+    """记录启动各阶段的开始时间和耗时，供/api/startup查询"""
+
+    def __init__(self, origin: float = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.stages = {}
+        self.finished_at = None
+        self.done = asyncio.Event()  # 后台服务全部启动后置位
+
+    def mark(self, name: str, start: float, end: float, error: str = None):
+        """记录一个已经完成的阶段，时间为perf_counter读数"""
+        self.stages[name] = {
+            "start_ms": round((start - self.origin) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1),
+            "status": "error" if error else "ok",
+            "error": error,
+        }
+
+    async def run(self, name: str, awaitable):
+        """执行一个阶段并计时，出错时记录错误而不中断其他阶段"""
+        start = time.perf_counter()
+        try:
+            result = await awaitable
+        except Exception as e:
+            print(f"启动阶段 {name} 出错: {e}")
+            self.mark(name, start, time.perf_counter(), str(e) or type(e).__name__)
+            return None
+        self.mark(name, start, time.perf_counter())
+        return result
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        self.done.set()
+        print(f"后台服务启动完成，耗时 {(self.finished_at - self.origin) * 1000:.0f}ms")
+
+    def report(self) -> dict:
+        return {
+            "finished": self.finished_at is not None,
+            "total_ms": round((self.finished_at - self.origin) * 1000, 1) if self.finished_at else None,
+            "stages": dict(sorted(self.stages.items(), key=lambda item: item[1]["start_ms"])),
+        }
@@ -0,0 +1,118 @@
+"""Valve KeyValues（VDF/ACF）文本格式解析
+
+支持带引号和不带引号的键值、转义字符、//注释和[$WIN32]之类的条件标记（忽略），
+不依赖缩进和空白的具体格式。结果为嵌套的dict，重复的键以后出现的为准。
+"""
+
+ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+# 写入时的转义，与ESCAPES互逆，反斜杠必须最先处理
+QUOTE_ESCAPES = (("\\", "\\\\"), ('"', '\\"'), ("\n", "\\n"), ("\t", "\\t"))
+
+
+def _tokenize(text: str):
+    """逐个产出(类型, 值, 行号)，类型为 string / { / }"""
+    i = 0
+    line = 1
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char == "\n":
+            line += 1
+            i += 1
+        elif char.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = length if end == -1 else end
+        elif char in "{}":
+            yield char, char, line
+            i += 1
+        elif char == '"':
+            start_line = line
+            i += 1
+            parts = []
+            while True:
+                if i >= length:
+                    raise ValueError(f"VDF第{start_line}行: 字符串没有结束引号")
+                char = text[i]
+                if char == '"':
+                    i += 1
+                    break
+                if char == "\\" and i + 1 < length:
+                    # 未知的转义保留原样，Windows路径中常见单个反斜杠
+                    nxt = text[i + 1]
+                    if nxt in ESCAPES:
+                        parts.append(ESCAPES[nxt])
+                        i += 2
+                        continue
+                if char == "\n":
+                    line += 1
+                parts.append(char)
+                i += 1
+            yield "string", "".join(parts), start_line
+        elif char == "[":
+            # 条件标记，例如 [$WIN32]，直接忽略
+            end = text.find("]", i)
+            if end == -1:
+                raise ValueError(f"VDF第{line}行: 条件标记没有结束")
+            i = end + 1
+        else:
+            start = i
+            while i < length and not text[i].isspace() and text[i] not in '{}"':
+                i += 1
+            yield "string", text[start:i], line
+
+
+def loads(text: str) -> dict:
+    """解析VDF文本"""
+    root = {}
+    stack = [root]
+    key = None
+    for kind, value, line in _tokenize(text.lstrip("\ufeff")):
+        if kind == "string":
+            if key is None:
+                key = value
+            else:
+                stack[-1][key] = value
+                key = None
+        elif kind == "{":
+            if key is None:
+                raise ValueError(f"VDF第{line}行: 块缺少键名")
+            block = {}
+            stack[-1][key] = block
+            stack.append(block)
+            key = None
+        else:
+            if key is not None or len(stack) == 1:
+                raise ValueError(f"VDF第{line}行: 多余的 }}")
+            stack.pop()
+    if key is not None:
+        raise ValueError(f"VDF结尾: 键 {key} 没有值")
+    if len(stack) != 1:
+        raise ValueError("VDF结尾: 缺少 }")
+    return root
+
+
+def quote(value) -> str:
+    """把值转换为带引号的VDF字符串，loads读回时得到原值"""
+    text = str(value)
+    for char, escaped in QUOTE_ESCAPES:
+        text = text.replace(char, escaped)
+    return f'"{text}"'
+
+
+def load(path) -> dict:
+    """读取并解析VDF文件"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return loads(f.read())
+
+
+def get(block: dict, key: str, default=None):
+    """不区分大小写地取出键值，Steam不同版本的键名大小写不一致"""
+    if key in block:
+        return block[key]
+    lowered = key.lower()
+    for name, value in block.items():
+        if name.lower() == lowered:
+            return value
+    return default